@@ -8,6 +8,7 @@ from src.armor_cleaner import ArmorFilter
 from src.auth import BungieOAuth
 from src.controller import AppController
 from src.destiny_api import ManifestBrowser
+from src.quality_memo import QualityMemo
 from src.ui import AppUI
 
 
@@ -26,8 +27,8 @@ def main():
 
     ui = AppUI(config_parser=configur)
     auth = BungieOAuth(cert_filepath=cert_filepath, key_filepath=key_filepath)
-    manifest_browser = ManifestBrowser()
-    armor_filter = ArmorFilter()
+    manifest_browser = ManifestBrowser(preload=True)
+    armor_filter = ArmorFilter(quality_memo=QualityMemo.load())
 
     controller = AppController(
         ui=ui,
@@ -1,7 +1,17 @@
 import polars as pl
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Tuple
 
+from src.armor_schema import (
+    CLASS_ITEM_SOURCE_LIST,
+    MAX_DISC_TARGET,
+    MIN_DISC_TARGET,
+    SOURCE_LIST,
+    Frame,
+    with_armor_schema,
+)
+from src.quality_memo import QUALITY_KEY_SCHEMA, QUALITY_MEMO_SCHEMA, QualityMemo
+
 
 STAT_COLS = [
     "Mobility",
@@ -12,20 +22,6 @@ STAT_COLS = [
     "Strength",
 ]
 
-SOURCE_LIST = [
-    "gardenofsalvation",
-    "dreaming",
-    "ironbanner",
-    "deepstonecrypt",
-    "vowofthedisciple",
-    "vaultofglass",
-    "salvationsedge",
-    "crotasend",
-    "nightmare",
-    "kingsfall",
-    "lastwish",
-]
-
 
 @dataclass
 class FilterParams:
@@ -37,33 +33,43 @@ class FilterParams:
     build_flags: dict[str, dict[str, bool]]
 
 
+@dataclass
+class QualitySurface:
+    # Scored armor with one quality per discipline target, so the armor to delete
+    # can be re-selected for any target without scoring again.
+    params: FilterParams
+    normal_armor: pl.DataFrame
+    artifice_armor: pl.DataFrame
+    class_armor: pl.DataFrame
+
+    def matches(self, params: FilterParams) -> bool:
+        # The max quality is only applied when selecting from the surface.
+        return (
+            replace(
+                params,
+                target_discipline=self.params.target_discipline,
+                max_quality=self.params.max_quality,
+            )
+            == self.params
+        )
+
+
 class ArmorFilter:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, quality_memo: QualityMemo | None = None) -> None:
+        self.quality_memo = quality_memo
+
+        # The last surface and the armor it was built from.
+        self.surface: QualitySurface | None = None
+        self.surface_df: pl.DataFrame | None = None
 
     def filter_armor_items(
         self, df: pl.DataFrame, params: FilterParams
     ) -> pl.DataFrame:
-        working_df = df
-
-        if params.always_keep_highest_power:
-            working_df = self.drop_highest_power_by_type(working_df)
-
-        if params.ignore_common_armor:
-            working_df = self.drop_common_armor(working_df)
-
-        """
-        Remove Exotic Class Items from consideration. This is not a feature I want to
-        add yet.
-        """
-        working_df = working_df.filter(
-            (
-                (pl.col("Tier") == "Exotic") & (pl.col("ItemSubType") == "ClassArmor")
-            ).not_()
-        )
+        return self.build_filter_plan(with_armor_schema(df.lazy()), params).collect()
 
+    def build_filter_plan(self, lf: pl.LazyFrame, params: FilterParams) -> pl.LazyFrame:
         normal_armor, artifice_armor, class_armor = self.split_armor_categories(
-            working_df
+            self.drop_excluded_armor(lf, params)
         )
 
         normal_armor = self.compute_quality(
@@ -71,33 +77,194 @@ class ArmorFilter:
             target_disc=params.target_discipline,
             build_flags=params.build_flags,
         )
-
         artifice_armor = self.min_quality_with_artifice_boost(
             df=artifice_armor,
             target_disc=params.target_discipline,
             build_flags=params.build_flags,
         )
 
-        normal_and_artifice = pl.concat([normal_armor, artifice_armor])
+        return self.select_armor_to_delete(
+            normal_armor, artifice_armor, class_armor, params.max_quality
+        )
+
+    def build_quality_surface(
+        self, df: pl.DataFrame, params: FilterParams
+    ) -> QualitySurface:
+        normal_armor, artifice_armor, class_armor = self.split_armor_categories(
+            self.drop_excluded_armor(with_armor_schema(df.lazy()), params)
+        )
+
+        if self.quality_memo is None:
+            normal_armor, artifice_armor, class_armor = pl.collect_all(
+                [
+                    self.with_quality_surface(
+                        normal_armor, params.build_flags, artifice=False
+                    ),
+                    self.with_quality_surface(
+                        artifice_armor, params.build_flags, artifice=True
+                    ),
+                    class_armor,
+                ]
+            )
+        else:
+            normal_armor, artifice_armor, class_armor = self.remember_quality_surface(
+                normal_armor, artifice_armor, class_armor, params
+            )
+
+        return QualitySurface(
+            params=params,
+            normal_armor=normal_armor,
+            artifice_armor=artifice_armor,
+            class_armor=class_armor,
+        )
+
+    def remember_quality_surface(
+        self,
+        normal_armor: pl.LazyFrame,
+        artifice_armor: pl.LazyFrame,
+        class_armor: pl.LazyFrame,
+        params: FilterParams,
+    ) -> Tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+        # Surfaces are looked up by roll and class flags, and only the rows the
+        # memo has not seen are scored. On a normal refresh that is the handful
+        # of pieces picked up since the last one.
+        keys = QUALITY_KEY_SCHEMA.names()
+        flags = self.build_flag_exprs(params.build_flags)
+
+        def looked_up(df: pl.LazyFrame) -> pl.LazyFrame:
+            return self.quality_memo.lookup(
+                df.with_row_index("Row").with_columns(
+                    flag.alias(flag_name) for flag_name, flag in flags.items()
+                )
+            )
+
+        normal_armor, artifice_armor, class_armor = pl.collect_all(
+            [looked_up(normal_armor), looked_up(artifice_armor), class_armor]
+        )
+
+        surfaces, scored = [], []
+        for df, artifice in [(normal_armor, False), (artifice_armor, True)]:
+            misses = df.filter(pl.col("Quality Surface").is_null())
+
+            # Planning the surface expressions costs more than scoring a few
+            # rows, so it is skipped when every row was found.
+            if not misses.is_empty():
+                misses = self.with_quality_surface(
+                    misses.drop("Quality Surface"), params.build_flags, artifice
+                )
+                scored.append(misses.select([*keys, "Quality Surface"]))
+
+                # Keepers break ties by row order, so the original order is
+                # restored.
+                df = pl.concat(
+                    [df.filter(pl.col("Quality Surface").is_not_null()), misses]
+                ).sort("Row")
+
+            surfaces.append(df.drop("Row", *flags.keys()))
+
+        # Rows of classes without build flags have null flags and are never
+        # stored, see build_flag_exprs.
+        used = pl.concat([normal_armor, artifice_armor]).select(keys).drop_nulls()
+        self.quality_memo.update(
+            used,
+            pl.concat(scored).drop_nulls(subset=keys)
+            if scored
+            else pl.DataFrame(schema=QUALITY_MEMO_SCHEMA).drop("Last Used"),
+        )
+
+        return surfaces[0], surfaces[1], class_armor
+
+    def quality_surface(
+        self, df: pl.DataFrame, params: FilterParams
+    ) -> QualitySurface:
+        # Rebuilt only when the armor or a setting that changes scoring does, so
+        # repeated runs over the same inventory only re-select from it.
+        if (
+            self.surface is None
+            or self.surface_df is not df
+            or not self.surface.matches(params)
+        ):
+            self.surface = self.build_quality_surface(df, params)
+            self.surface_df = df
+
+        return self.surface
+
+    def filter_quality_surface(
+        self, surface: QualitySurface, target_disc: int, max_quality: float
+    ) -> pl.DataFrame:
+        normal_armor = surface.normal_armor.lazy()
+        artifice_armor = surface.artifice_armor.lazy()
+
+        if MIN_DISC_TARGET <= target_disc <= MAX_DISC_TARGET:
+            quality = (
+                pl.col("Quality Surface")
+                .arr.get(target_disc - MIN_DISC_TARGET)
+                .alias("Quality")
+            )
+            normal_armor = normal_armor.with_columns(quality)
+            artifice_armor = artifice_armor.with_columns(quality)
+        else:
+            # Targets the surface does not cover are scored in full.
+            build_flags = surface.params.build_flags
+            normal_armor = self.compute_quality(normal_armor, target_disc, build_flags)
+            artifice_armor = self.min_quality_with_artifice_boost(
+                artifice_armor, target_disc, build_flags
+            )
+
+        return self.select_armor_to_delete(
+            normal_armor, artifice_armor, surface.class_armor.lazy(), max_quality
+        ).collect()
+
+    def drop_excluded_armor(
+        self, lf: pl.LazyFrame, params: FilterParams
+    ) -> pl.LazyFrame:
+        working_lf = lf
+
+        if params.always_keep_highest_power:
+            working_lf = self.drop_highest_power_by_type(working_lf)
+
+        if params.ignore_common_armor:
+            working_lf = self.drop_common_armor(working_lf)
+
+        """
+        Remove Exotic Class Items from consideration. This is not a feature I want to
+        add yet.
+        """
+        working_lf = working_lf.filter(
+            (
+                (pl.col("Tier") == "Exotic") & (pl.col("ItemSubType") == "ClassArmor")
+            ).not_()
+        )
+
+        return working_lf
+
+    def select_armor_to_delete(
+        self,
+        normal_armor: Frame,
+        artifice_armor: Frame,
+        class_armor: Frame,
+        max_quality: float,
+    ) -> Frame:
+        normal_and_artifice = pl.concat([normal_armor, artifice_armor], how="diagonal")
 
         exotics_armor_df = artifice_armor.filter(pl.col("Tier") == "Exotic")
         exotics_to_delete = self.filter_exotic_armor(
-            df=exotics_armor_df, max_quality=params.max_quality
+            df=exotics_armor_df, max_quality=max_quality
         )
 
         normal_legendaries = normal_and_artifice.filter(
             (pl.col("Source").is_null()) & (pl.col("Tier") != "Exotic")
         )
 
-        mod_armor = normal_and_artifice.filter((pl.col("Source").is_in(SOURCE_LIST)))
+        mod_armor = normal_and_artifice.filter(pl.col("Source").is_in(SOURCE_LIST))
 
         mod_armor_to_delete = self.filter_mod_armor(
-            df=mod_armor, max_quality=params.max_quality
+            df=mod_armor, max_quality=max_quality
         )
 
         legendaries_to_delete = self.filter_normal_and_artifice(
             df=normal_legendaries,
-            max_quality=params.max_quality,
+            max_quality=max_quality,
         )
 
         class_items_to_delete = self.filter_class_items(df=class_armor)
@@ -111,130 +278,90 @@ class ArmorFilter:
             ]
         )
 
-    def filter_mod_armor(self, df: pl.DataFrame, max_quality: float) -> pl.DataFrame:
-        column_order = df.columns
-
-        armor_to_keep = (
-            df.sort(["Quality"], descending=False)
-            .group_by(["ItemSubType", "Equippable", "Source"])
-            .first()
-            .select(column_order)
-        )
-        armor_to_drop = df.join(armor_to_keep, how="anti", on="Id").filter(
-            pl.col("Quality") > max_quality
+    def filter_mod_armor(self, df: Frame, max_quality: float) -> Frame:
+        is_keeper = self.keep_best_per_group(
+            group_by=["ItemSubType", "Equippable", "Source"], order_by=["Quality"]
         )
+        armor_to_drop = df.filter(is_keeper.not_() & (pl.col("Quality") > max_quality))
         output_df = armor_to_drop.select(pl.col(["Id", "Hash"]))
         return output_df
 
-    def filter_class_items(self, df: pl.DataFrame) -> pl.DataFrame:
-        column_order = df.columns
-        sources_to_keep = [
-            "gardenofsalvation",
-            "dreaming",
-            "ironbanner",
-            "deepstonecrypt",
-            "vowofthedisciple",
-            "vaultofglass",
-            "salvationsedge",
-            "crotasend",
-            "nightmare",
-            "kingsfall",
-            "lastwish",
-            "guardiangames",
-        ]
-
-        artifice = df.filter(pl.col("IsArtifice"))
-
-        artifice_to_keep = (
-            artifice.sort(["Energy Capacity", "Power"], descending=True)
-            .group_by(["Source", "Equippable"])
-            .first()
-            .select(column_order)
+    def filter_class_items(self, df: Frame) -> Frame:
+        is_best = self.keep_best_per_group(
+            group_by=["IsArtifice", "Source", "Equippable"],
+            order_by=["Energy Capacity", "Power"],
+            descending=True,
         )
-        artifice_to_drop = artifice.join(artifice_to_keep, how="anti", on="Id")
-
-        regular_items = df.filter(~pl.col("IsArtifice"))
-
-        preferred_to_keep = (
-            regular_items.sort(["Energy Capacity", "Power"], descending=True)
-            .filter(pl.col("Source").is_in(sources_to_keep))
-            .group_by(["Source", "Equippable"])
-            .first()
-            .select(column_order)
-        )
-        fallback = (
-            regular_items.sort(["Energy Capacity", "Power"], descending=True)
-            .group_by("Source", "Equippable")
-            .first()
-            .select(column_order)
-        )
-        fallback_needed = fallback.join(preferred_to_keep, how="anti", on="Equippable")
-        regular_to_keep = pl.concat(
-            [preferred_to_keep, fallback_needed], how="vertical"
+        is_preferred = pl.col("Source").is_in(CLASS_ITEM_SOURCE_LIST).fill_null(False)
+        has_preferred = is_preferred.any().over(["IsArtifice", "Equippable"])
+
+        # Artifice class items keep the best per source. Regular ones keep the best
+        # per preferred source, falling back to every source when a class has no
+        # preferred class item at all.
+        is_keeper = is_best & (
+            pl.col("IsArtifice") | is_preferred | has_preferred.not_()
         )
 
-        regular_to_drop = regular_items.join(regular_to_keep, how="anti", on="Id")
-
-        to_remove = pl.concat([artifice_to_drop, regular_to_drop], how="vertical")
-
-        output_df = to_remove.select(["Id", "Hash"])
+        output_df = df.filter(is_keeper.not_()).select(["Id", "Hash"])
 
         return output_df
 
-    def filter_exotic_armor(self, df: pl.DataFrame, max_quality: float) -> pl.DataFrame:
-        column_order = df.columns
-
-        exotics_to_keep = (
-            df.sort(["Quality"], descending=False)
-            .group_by("Hash")
-            .head(2)
-            .select(column_order)
+    def filter_exotic_armor(self, df: Frame, max_quality: float) -> Frame:
+        is_keeper = self.keep_best_per_group(
+            group_by=["Hash"], order_by=["Quality"], k=2
         )
-        exotics_to_drop = df.join(exotics_to_keep, how="anti", on="Id").filter(
-            pl.col("Quality") > max_quality
+        exotics_to_drop = df.filter(
+            is_keeper.not_() & (pl.col("Quality") > max_quality)
         )
 
         output_df = exotics_to_drop.select(pl.col(["Id", "Hash"]))
 
         return output_df
 
-    def filter_normal_and_artifice(
-        self, df: pl.DataFrame, max_quality: float
-    ) -> pl.DataFrame:
-        column_order = df.columns
-        armor_to_keep = (
-            df.sort(["Quality"], descending=False)
-            .group_by(["Equippable", "ItemSubType"])
-            .first()
-            .select(column_order)
-        )
-        armor_to_drop = df.join(armor_to_keep, how="anti", on="Id").filter(
-            pl.col("Quality") > max_quality
+    def filter_normal_and_artifice(self, df: Frame, max_quality: float) -> Frame:
+        is_keeper = self.keep_best_per_group(
+            group_by=["Equippable", "ItemSubType"], order_by=["Quality"]
         )
+        armor_to_drop = df.filter(is_keeper.not_() & (pl.col("Quality") > max_quality))
         output_df = armor_to_drop.select(pl.col(["Id", "Hash"]))
         return output_df
 
+    def keep_best_per_group(
+        self,
+        group_by: list[str],
+        order_by: list[str],
+        descending: bool = False,
+        k: int = 1,
+    ) -> pl.Expr:
+        # An ordinal rank breaks ties by row order, so keepers are marked in place
+        # instead of being re-joined on Id. Struct ranks order nulls first, so each
+        # column is led by a null flag that places unscored rows last either way.
+        keys = []
+        for column in order_by:
+            is_unscored = pl.col(column).is_null()
+            keys += [
+                (is_unscored.not_() if descending else is_unscored).alias(
+                    f"{column} Unscored"
+                ),
+                pl.col(column),
+            ]
+
+        rank = pl.struct(keys).rank("ordinal", descending=descending).over(group_by)
+        return rank <= k
+
     def compute_quality(
         self,
-        df: pl.DataFrame,
+        df: Frame,
         target_disc: int,
         build_flags: dict[str, dict[str, bool]],
-    ) -> pl.DataFrame:
+    ) -> Frame:
         working_df = df
 
         working_df = self.compute_segment_gaps(working_df)
 
-        with_build_gaps = pl.DataFrame()
-
-        classes = ["Hunter", "Warlock", "Titan"]
-        for equippable in classes:
-            class_flags = build_flags[equippable]
-            class_specific = self.compute_class_build_gap(
-                working_df, equippable, class_flags
-            )
-            with_build_gaps = pl.concat([with_build_gaps, class_specific])
+        working_df = self.compute_build_gap(working_df, build_flags)
 
-        working_df = self.compute_top_segment_decay(with_build_gaps)
+        working_df = self.compute_top_segment_decay(working_df)
 
         working_df = self.compute_discipline_quality(working_df, target_disc)
 
@@ -249,45 +376,157 @@ class ArmorFilter:
 
     def min_quality_with_artifice_boost(
         self,
-        df: pl.DataFrame,
+        df: Frame,
         target_disc: int,
         build_flags: dict[str, dict[str, bool]],
-    ):
-        working_df = df
-
-        final_df = self.compute_quality(working_df, target_disc, build_flags)
+    ) -> Frame:
+        flags = self.build_flag_exprs(build_flags)
+        stats = {stat: self.stat_expr(stat) for stat in STAT_COLS}
 
+        variants = [self.quality_expr(stats, target_disc, flags)]
         for stat in STAT_COLS:
-            working_df = working_df.with_columns([(pl.col(stat) + 3).alias(stat)])
-            working_df = self.compute_quality(working_df, target_disc, build_flags)
+            boosted_stats = stats | {stat: pl.col(stat) + 3}
+            variants.append(self.quality_expr(boosted_stats, target_disc, flags))
 
-            final_df = final_df.with_columns(
-                [
-                    pl.min_horizontal(
-                        pl.col("Quality"), pl.lit(working_df["Quality"])
-                    ).alias("Quality")
-                ]
+        working_df = df.with_columns(pl.concat_list(variants).alias("Boost Qualities"))
+
+        # Index 0 is the unboosted roll, so ties resolve to "no boost needed".
+        working_df = working_df.with_columns(
+            pl.col("Boost Qualities").list.min().alias("Quality"),
+            pl.col("Boost Qualities")
+            .list.arg_min()
+            .replace_strict(
+                old=list(range(1, len(STAT_COLS) + 1)),
+                new=STAT_COLS,
+                default=None,
+                return_dtype=pl.String,
             )
+            .alias("Artifice Stat"),
+        ).drop("Boost Qualities")
 
-            working_df = working_df.with_columns([(pl.col(stat) - 3).alias(stat)])
+        return working_df
 
-        return final_df
+    def with_quality_surface(
+        self, df: Frame, build_flags: dict[str, dict[str, bool]], artifice: bool
+    ) -> Frame:
+        # Only the discipline term depends on the target, so the rest of each
+        # variant is computed once. The terms are combined exactly as in
+        # quality_expr, so every entry equals the Quality a full run at that
+        # target would compute.
+        flags = self.build_flag_exprs(build_flags)
+        stats = {stat: self.stat_expr(stat) for stat in STAT_COLS}
+
+        def top_segment_decay(variant: dict[str, pl.Expr]) -> pl.Expr:
+            mob, res, rec = (
+                variant["Mobility"],
+                variant["Resilience"],
+                variant["Recovery"],
+            )
+            build_gap = pl.min_horizontal(
+                self.pair_gap_expr(flags["MobRes"], mob, res),
+                self.pair_gap_expr(flags["ResRec"], res, rec),
+                self.pair_gap_expr(flags["MobRec"], mob, rec),
+            )
+            return build_gap / 7 + self.segment_gap_expr(mob, res, rec) / 3
+
+        def bottom_segment_gap(variant: dict[str, pl.Expr]) -> pl.Expr:
+            return self.segment_gap_expr(
+                variant["Discipline"], variant["Intellect"], variant["Strength"]
+            )
+
+        # (top segment decay, bottom segment gap, discipline) per candidate.
+        candidates = [
+            (top_segment_decay(stats), bottom_segment_gap(stats), stats["Discipline"])
+        ]
+        if artifice:
+            boosted = {stat: stats | {stat: pl.col(stat) + 3} for stat in STAT_COLS}
+            top, bottom, discipline = candidates[0]
+
+            # A boost to a top stat only lowers the top segment decay, and one to
+            # Intellect or Strength only the bottom segment gap. Quality grows
+            # with both, so the best of each group is taken before the
+            # per-target terms are added, which leaves three candidates instead
+            # of seven with the same minimum.
+            candidates = [
+                (
+                    pl.min_horizontal(
+                        top,
+                        *[
+                            top_segment_decay(boosted[stat])
+                            for stat in ["Mobility", "Resilience", "Recovery"]
+                        ],
+                    ),
+                    bottom,
+                    discipline,
+                ),
+                (
+                    top,
+                    pl.min_horizontal(
+                        bottom,
+                        *[
+                            bottom_segment_gap(boosted[stat])
+                            for stat in ["Intellect", "Strength"]
+                        ],
+                    ),
+                    discipline,
+                ),
+                (
+                    top,
+                    bottom_segment_gap(boosted["Discipline"]),
+                    boosted["Discipline"]["Discipline"],
+                ),
+            ]
 
-    def drop_highest_power_by_type(self, df: pl.DataFrame) -> pl.DataFrame:
+        terms = []
+        for i, (top, bottom, discipline) in enumerate(candidates):
+            terms += [
+                top.alias(f"Top Segment Decay {i}"),
+                bottom.alias(f"Bottom Segment Gap {i}"),
+                discipline.alias(f"Discipline {i}"),
+            ]
+
+        targets = range(MIN_DISC_TARGET, MAX_DISC_TARGET + 1)
+        surface = pl.concat_list(
+            [
+                pl.min_horizontal(
+                    [
+                        pl.col(f"Top Segment Decay {i}")
+                        + (
+                            pl.col(f"Bottom Segment Gap {i}")
+                            + self.discipline_quality_expr(
+                                pl.col(f"Discipline {i}"), target
+                            )
+                        )
+                        / 4
+                        for i in range(len(candidates))
+                    ]
+                )
+                for target in targets
+            ]
+        ).list.to_array(len(targets))
+
+        return (
+            df.with_columns(terms)
+            .with_columns(surface.alias("Quality Surface"))
+            .drop([term.meta.output_name() for term in terms])
+        )
+
+    def drop_highest_power_by_type(self, df: Frame) -> Frame:
         highest_power_rows = (
-            df.sort("Power", descending=True).group_by("ItemSubType").first()
+            df.sort("Power", descending=True)
+            .group_by("ItemSubType")
+            .first()
+            .select(["ItemSubType", "Power"])
         )
 
         output_df = df.join(highest_power_rows, on=["ItemSubType", "Power"], how="anti")
         return output_df
 
-    def drop_common_armor(self, df: pl.DataFrame) -> pl.DataFrame:
+    def drop_common_armor(self, df: Frame) -> Frame:
         output_df = df.filter(pl.col("Tier") != "Common")
         return output_df
 
-    def split_armor_categories(
-        self, df: pl.DataFrame
-    ) -> Tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+    def split_armor_categories(self, df: Frame) -> Tuple[Frame, Frame, Frame]:
         normal_armor = df.filter(
             (pl.col("IsArtifice") | (pl.col("ItemSubType") == "ClassArmor")).not_()
         )
@@ -300,40 +539,62 @@ class ArmorFilter:
 
         return (normal_armor, artifice_armor, class_armor)
 
-    def compute_segment_gaps(self, df: pl.DataFrame) -> pl.DataFrame:
+    def compute_segment_gaps(self, df: Frame) -> Frame:
         working_df = df.with_columns(
-            (34 - (pl.col("Mobility") + pl.col("Resilience") + pl.col("Recovery")))
-            .clip(lower_bound=0, upper_bound=12)
-            .alias("Top Segment Gap"),
-            (34 - (pl.col("Discipline") + pl.col("Intellect") + pl.col("Strength")))
-            .clip(lower_bound=0, upper_bound=12)
-            .alias("Bottom Segment Gap"),
+            self.segment_gap_expr(
+                self.stat_expr("Mobility"),
+                self.stat_expr("Resilience"),
+                self.stat_expr("Recovery"),
+            ).alias("Top Segment Gap"),
+            self.segment_gap_expr(
+                self.stat_expr("Discipline"),
+                self.stat_expr("Intellect"),
+                self.stat_expr("Strength"),
+            ).alias("Bottom Segment Gap"),
         )
 
         return working_df
 
-    def compute_class_build_gap(
-        self, df: pl.DataFrame, classType: str, build_flags: dict[str, bool]
-    ) -> pl.DataFrame:
-        working_df = df.filter(pl.col("Equippable") == classType)
+    def build_flag_exprs(
+        self, build_flags: dict[str, dict[str, bool]]
+    ) -> dict[str, pl.Expr]:
+        # Rows whose class has no flags (e.g. "Unknown") get null flags and end up
+        # with a null Quality, so they are kept rather than silently dropped.
+        classes = list(build_flags)
+        flag_names = ["MobRes", "ResRec", "MobRec"]
+
+        return {
+            flag_name: pl.col("Equippable").replace_strict(
+                old=classes,
+                new=[build_flags[equippable][flag_name] for equippable in classes],
+                default=None,
+                return_dtype=pl.Boolean,
+            )
+            for flag_name in flag_names
+        }
 
-        working_df = working_df.with_columns(
+    def compute_build_gap(
+        self, df: Frame, build_flags: dict[str, dict[str, bool]]
+    ) -> Frame:
+        flags = self.build_flag_exprs(build_flags)
+
+        working_df = df.with_columns(
             [
-                pl.when(build_flags["MobRes"])
-                .then(32 - (pl.col("Mobility") + pl.col("Resilience")))
-                .otherwise(28)
-                .clip(lower_bound=0, upper_bound=28)
-                .alias("Mob Res Gap"),
-                pl.when(build_flags["ResRec"])
-                .then(32 - (pl.col("Resilience") + pl.col("Recovery")))
-                .otherwise(28)
-                .clip(lower_bound=0, upper_bound=28)
-                .alias("Res Rec Gap"),
-                pl.when(build_flags["MobRec"])
-                .then(32 - (pl.col("Mobility") + pl.col("Recovery")))
-                .otherwise(28)
-                .clip(lower_bound=0, upper_bound=28)
-                .alias("Mob Rec Gap"),
+                self.pair_gap_expr(
+                    flags["MobRes"],
+                    self.stat_expr("Mobility"),
+                    self.stat_expr("Resilience"),
+                ).alias("Mob Res Gap"),
+                self.pair_gap_expr(
+                    flags["ResRec"],
+                    self.stat_expr("Resilience"),
+                    self.stat_expr("Recovery"),
+                ).alias("Res Rec Gap"),
+                self.pair_gap_expr(
+                    flags["MobRec"],
+                    self.stat_expr("Mobility"),
+                    self.stat_expr("Recovery"),
+                ).alias("Mob Rec Gap"),
             ]
         )
 
@@ -345,7 +606,7 @@ class ArmorFilter:
 
         return working_df
 
-    def compute_top_segment_decay(self, df: pl.DataFrame) -> pl.DataFrame:
+    def compute_top_segment_decay(self, df: Frame) -> Frame:
         working_df = df.with_columns(
             (pl.col("Build Gap") / 7 + pl.col("Top Segment Gap") / 3).alias(
                 "Top Segment Decay"
@@ -354,13 +615,53 @@ class ArmorFilter:
 
         return working_df
 
-    def compute_discipline_quality(
-        self, df: pl.DataFrame, target_disc: int
-    ) -> pl.DataFrame:
+    def compute_discipline_quality(self, df: Frame, target_disc: int) -> Frame:
         working_df = df.with_columns(
-            (5 - (5 * pl.col("Discipline") / target_disc))
-            .clip(lower_bound=0)
-            .alias("Discipline Quality")
+            self.discipline_quality_expr(
+                self.stat_expr("Discipline"), target_disc
+            ).alias("Discipline Quality")
         )
 
         return working_df
+
+    def stat_expr(self, stat: str) -> pl.Expr:
+        # Stats are stored unsigned, so widen before computing gaps that may go
+        # negative ahead of clipping.
+        return pl.col(stat).cast(pl.Int16)
+
+    def segment_gap_expr(self, a: pl.Expr, b: pl.Expr, c: pl.Expr) -> pl.Expr:
+        return (34 - (a + b + c)).clip(lower_bound=0, upper_bound=12)
+
+    def pair_gap_expr(self, enabled: pl.Expr, a: pl.Expr, b: pl.Expr) -> pl.Expr:
+        return (
+            pl.when(enabled)
+            .then(32 - (a + b))
+            .when(enabled.not_())
+            .then(28)
+            .clip(lower_bound=0, upper_bound=28)
+        )
+
+    def discipline_quality_expr(self, discipline: pl.Expr, target_disc: int) -> pl.Expr:
+        return (5 - (5 * discipline / target_disc)).clip(lower_bound=0)
+
+    def quality_expr(
+        self,
+        stats: dict[str, pl.Expr],
+        target_disc: int,
+        build_flags: dict[str, pl.Expr],
+    ) -> pl.Expr:
+        mob, res, rec = stats["Mobility"], stats["Resilience"], stats["Recovery"]
+        dis, int_, str_ = stats["Discipline"], stats["Intellect"], stats["Strength"]
+
+        build_gap = pl.min_horizontal(
+            self.pair_gap_expr(build_flags["MobRes"], mob, res),
+            self.pair_gap_expr(build_flags["ResRec"], res, rec),
+            self.pair_gap_expr(build_flags["MobRec"], mob, rec),
+        )
+        top_segment_decay = build_gap / 7 + self.segment_gap_expr(mob, res, rec) / 3
+        bottom_segment_gap = self.segment_gap_expr(dis, int_, str_)
+
+        return (
+            top_segment_decay
+            + (bottom_segment_gap + self.discipline_quality_expr(dis, target_disc)) / 4
+        )
@@ -0,0 +1,126 @@
+from typing import TypeVar
+
+import polars as pl
+
+
+item_subtype_map = {
+    26: "HelmetArmor",
+    27: "GauntletsArmor",
+    28: "ChestArmor",
+    29: "LegArmor",
+    30: "ClassArmor",
+}
+
+class_type_map = {
+    0: "Titan",
+    1: "Hunter",
+    2: "Warlock",
+    3: "Unknown",
+}
+
+TIER_NAMES = [
+    "Basic",
+    "Common",
+    "Uncommon",
+    "Rare",
+    "Legendary",
+    "Exotic",
+]
+
+SOURCE_LIST = [
+    "gardenofsalvation",
+    "dreaming",
+    "ironbanner",
+    "deepstonecrypt",
+    "vowofthedisciple",
+    "vaultofglass",
+    "salvationsedge",
+    "crotasend",
+    "nightmare",
+    "kingsfall",
+    "lastwish",
+]
+
+CLASS_ITEM_SOURCE_LIST = SOURCE_LIST + ["guardiangames"]
+
+MIN_DISC_TARGET = 2
+MAX_DISC_TARGET = 30
+
+# ManifestBrowser falls back to "None" for subtypes and classes it does not know.
+ItemSubType = pl.Enum([*item_subtype_map.values(), "None"])
+ClassType = pl.Enum([*class_type_map.values(), "None"])
+Tier = pl.Enum(TIER_NAMES)
+Source = pl.Enum(CLASS_ITEM_SOURCE_LIST)
+
+STAT_DTYPE = pl.UInt8
+
+ARMOR_SCHEMA = pl.Schema(
+    {
+        "Name": pl.String,
+        "Hash": pl.UInt32,
+        "Id": pl.UInt64,
+        "Tier": Tier,
+        "ItemSubType": ItemSubType,
+        "Source": Source,
+        "Equippable": ClassType,
+        "Power": pl.UInt16,
+        "Energy Capacity": pl.UInt8,
+        "IsMasterworked": pl.Boolean,
+        "IsArtifice": pl.Boolean,
+        "Mobility": STAT_DTYPE,
+        "Resilience": STAT_DTYPE,
+        "Recovery": STAT_DTYPE,
+        "Discipline": STAT_DTYPE,
+        "Intellect": STAT_DTYPE,
+        "Strength": STAT_DTYPE,
+        "Total": STAT_DTYPE,
+    }
+)
+
+# The per-instance columns read from the profile; everything else comes from the
+# manifest projection.
+PROFILE_ARMOR_SCHEMA = pl.Schema(
+    {
+        name: ARMOR_SCHEMA[name]
+        for name in [
+            "Hash",
+            "Id",
+            "Power",
+            "Energy Capacity",
+            "Mobility",
+            "Resilience",
+            "Recovery",
+            "Discipline",
+            "Intellect",
+            "Strength",
+            "Total",
+        ]
+    }
+)
+
+# The per-instance columns that can change between refreshes (infusing,
+# masterworking) without the instance id changing.
+INSTANCE_ARMOR_SCHEMA = pl.Schema(
+    {name: ARMOR_SCHEMA[name] for name in ["Id", "Power", "Energy Capacity"]}
+)
+
+# One row per socket of an armor instance, as reported by the profile.
+SOCKET_SCHEMA = pl.Schema(
+    {"Id": ARMOR_SCHEMA["Id"], "PlugHash": pl.UInt32, "IsEnabled": pl.Boolean}
+)
+
+Frame = TypeVar("Frame", pl.DataFrame, pl.LazyFrame)
+
+
+def with_armor_schema(df: Frame) -> Frame:
+    columns = df.collect_schema()
+    to_cast = {
+        name: dtype
+        for name, dtype in ARMOR_SCHEMA.items()
+        if name in columns and columns[name] != dtype
+    }
+
+    if not to_cast:
+        return df
+
+    return df.cast(to_cast)
@@ -1,26 +1,49 @@
-import os
+import copy
+import threading
+from dataclasses import dataclass, field
 from typing import Optional
 
 import polars as pl
 from PyQt5.QtCore import QThreadPool, QTimer
-
-from src.armor_cleaner import ArmorFilter, FilterParams
+from PyQt5.QtGui import QImage, QPixmap, QPixmapCache
+
+from src.armor_cleaner import (
+    MAX_DISC_TARGET,
+    MIN_DISC_TARGET,
+    STAT_COLS,
+    ArmorFilter,
+    FilterParams,
+    QualitySurface,
+)
+from src.armor_schema import (
+    ARMOR_SCHEMA,
+    INSTANCE_ARMOR_SCHEMA,
+    PROFILE_ARMOR_SCHEMA,
+    Source,
+)
 from src.auth import BungieOAuth
 from src.destiny_api import ManifestBrowser
-from src.ui import AppUI, HoverImage
-from src.workers import IconLoaderRunnable
+from src.icon_store import IconStore
+from src.inventory import ArmorInventory, InventoryChanges
+from src.manifest_index import base_stats_from_sockets
+from src.pixmaps import composite_pixmap, pixmap_from_image
+from src.profile_ingest import ProfileData, parse_profile
+from src.snapshot import InventorySnapshot
+from src.ui import AppUI, ArmorGridItem
+from src.workers import IconLoaderRunnable, RefreshRunnable
+
+
+@dataclass
+class RefreshResult:
+    params: FilterParams
+    df: Optional[pl.DataFrame] = None
+    fingerprint: Optional[str] = None
+    trash_df: Optional[pl.DataFrame] = None
+    armor_stats: dict[int, tuple] = field(default_factory=dict)
+    surface: Optional[QualitySurface] = None
 
 
 class AppController:
-    item_stats_map = {
-        "144602215": "Intellect",
-        "392767087": "Resilience",
-        "1735777505": "Discipline",
-        "1943323491": "Recovery",
-        "2996146975": "Mobility",
-        "4244567218": "Strength",
-    }
-
     source_map = {
         'Source: "Root of Nightmares" Raid': "nightmare",
         'Source: "Garden of Salvation" Raid': "gardenofsalvation",
@@ -51,16 +74,43 @@ class AppController:
         self.auth = auth
         self.configur = configur
         self.thread_pool = QThreadPool()
-        self.thread_pool.setMaxThreadCount(1)
-
-        auth_token = self.auth.authenticate()
-        self.api.set_auth_token(auth_token)
+        self.thread_pool.setMaxThreadCount(self.api.icon_fetcher.pool_size)
+        # Refreshes run one at a time on their own pool so icon downloads never
+        # queue behind them. The inventory is only ever touched from this pool.
+        self.refresh_pool = QThreadPool()
+        self.refresh_pool.setMaxThreadCount(1)
+        # Re-scoring needs no network, so it never waits behind a profile fetch.
+        # Runs from both pools take turns on the scoring stage.
+        self.scoring_pool = QThreadPool()
+        self.scoring_pool.setMaxThreadCount(1)
+        self.scoring_lock = threading.Lock()
+        self.refresh_generation = 0
+        self.icon_generation = 0
+        self.icon_store = IconStore(
+            fetcher=self.api.icon_fetcher,
+            max_bytes=self.configur.getint("values", "ICON_CACHE_MB", fallback=256)
+            * 1024
+            * 1024,
+        )
 
-        self.mem_id, self.mem_type = self.api.get_membership_for_user()
+        # Set once connect() has signed in, until then refreshes only re-score.
+        self.mem_id, self.mem_type = None, None
+        self.has_snapshot = False
 
         self.filepath: Optional[str] = None
         self.text_result: Optional[str] = None
-        self.image_placeholders: dict = {}
+        self.result_message: Optional[str] = None
+        # hash -> [(grid row, armor id)] for the items waiting on that icon.
+        self.image_placeholders: dict[int, list[tuple[int, int]]] = {}
+        self.armor_stats: dict[int, tuple] = {}
+        # hash -> QPixmapCache key of its composited icon.
+        self.icon_cache_keys: dict[int, str] = {}
+        self.quality_surface: Optional[QualitySurface] = None
+        self.df = pl.DataFrame(schema=ARMOR_SCHEMA)
+        self.inventory = ArmorInventory()
+        self.inventory_changes = InventoryChanges()
+        self.last_profile_fingerprint: Optional[str] = None
+        self.last_filter_params: Optional[FilterParams] = None
 
         self.ignore_common_armor = self.configur.getboolean("values", "IGNORE_COMMONS")
         self.always_keep_highest_power = False
@@ -73,8 +123,10 @@ class AppController:
         self.max_quality: float = self.configur.getfloat(
             "values", "DEFAULT_MAX_QUALITY"
         )
-        self.target_discipline: int = self.configur.getint(
-            "values", "DEFAULT_DISC_TARGET"
+        # Kept within the slider's range, whatever config.ini says.
+        target_discipline = self.configur.getint("values", "DEFAULT_DISC_TARGET")
+        self.target_discipline: int = min(
+            max(target_discipline, MIN_DISC_TARGET), MAX_DISC_TARGET
         )
 
         self.connect_signals()
@@ -89,181 +141,267 @@ class AppController:
         self.ui.checkbox_grid_triggered.connect(self.handle_checkbox_change)
 
     def handle_armor_refresh(self) -> None:
+        self.start_refresh(fetch_profile=self.mem_id is not None)
+
+    def start_refresh(self, fetch_profile: bool) -> None:
+        # A newer refresh supersedes every older one. Queued runs are dropped
+        # and a running one stops at its next stage.
+        self.refresh_generation += 1
+        self.refresh_pool.clear()
+        self.scoring_pool.clear()
+
+        params = self.get_filter_params()
+        task = RefreshRunnable(
+            self.refresh_generation,
+            lambda report_progress: self.run_refresh(
+                fetch_profile, params, report_progress
+            ),
+            lambda generation: generation == self.refresh_generation,
+        )
+        task.signals.progress.connect(self._on_refresh_progress)
+        task.signals.finished.connect(self._on_refresh_finished)
+        task.signals.failed.connect(self._on_refresh_failed)
+
         self.ui.set_process_enabled_state(False)
+        (self.refresh_pool if fetch_profile else self.scoring_pool).start(task)
+
+    def run_refresh(
+        self, fetch_profile: bool, params: FilterParams, report_progress
+    ) -> RefreshResult:
+        # Runs on the refresh pool. Only the finished result reaches the GUI.
+        result = RefreshResult(params=params)
+        df = self.df
+
+        if fetch_profile:
+            report_progress("Fetching profile...")
+            known_fingerprint = self.last_profile_fingerprint
+            profile = parse_profile(
+                self.fetch_profile(),
+                self.api.get_armor_hashes(),
+                known_fingerprint=known_fingerprint,
+            )
+            fingerprint = profile.fingerprint
+
+            # Errors are raised by parse_profile, so only a profile that really
+            # matches the last one is skipped. Its items are not parsed at all.
+            if fingerprint != known_fingerprint:
+                report_progress("Updating inventory...")
+                df = result.df = self.create_armor_df(profile)
+                result.fingerprint = fingerprint
+            elif self.last_filter_params == params:
+                # The grid and clipboard already match this profile and these
+                # settings.
+                return result
+
+        with self.scoring_lock:
+            report_progress("Scoring armor...")
+            result.surface = self.armor_cleaner.quality_surface(df, params)
+            result.trash_df = self.armor_cleaner.filter_quality_surface(
+                result.surface, params.target_discipline, params.max_quality
+            )
+            result.armor_stats = self.collect_armor_stats(df, result.trash_df)
 
-        self.ui.clear_photo_grid()
-        self.image_placeholders = {}
+            InventorySnapshot(df=df, trash_df=result.trash_df, params=params).save()
+            if self.armor_cleaner.quality_memo is not None:
+                self.armor_cleaner.quality_memo.save()
 
-        self.df = self.create_armor_df()
+        return result
 
-        self.handle_process()
+    def collect_armor_stats(
+        self, df: pl.DataFrame, trash_df: pl.DataFrame
+    ) -> dict[int, tuple]:
+        stats_df = df.join(trash_df.select("Id"), on="Id", how="semi").select(
+            ["Id", *STAT_COLS]
+        )
+        return {row[0]: row[1:] for row in stats_df.iter_rows()}
 
-        self.ui.set_process_enabled_state(True)
+    def _on_refresh_progress(self, generation: int, stage: str) -> None:
+        if generation == self.refresh_generation:
+            self.ui.write_to_status_bar(stage)
 
-    def start_app(self):
-        self.ui.show()
+    def _on_refresh_failed(self, generation: int, message: str) -> None:
+        if generation != self.refresh_generation:
+            return
 
-        self.handle_armor_refresh()
+        self.ui.write_to_status_bar(f"Refresh failed: {message}")
+        self.ui.set_process_enabled_state(True)
 
-        self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.handle_armor_refresh)
-        self.refresh_timer.start(30 * 1000)
+    def _on_refresh_finished(self, generation: int, result: RefreshResult) -> None:
+        if generation != self.refresh_generation:
+            return
 
-    def create_armor_df(self) -> pl.DataFrame:
-        assert self.mem_type is not None and self.mem_id is not None, ValueError(
-            "mem_type or mem_id is None"
-        )
+        if result.df is not None:
+            self.df = result.df
+            self.last_profile_fingerprint = result.fingerprint
 
-        res = self.api.query_protected_endpoint(
-            f"https://www.bungie.net/Platform/Destiny2/"
-            f"{self.mem_type}/Profile/{self.mem_id}/"
-            "?components=102,201,205,300,302,304,305"
-        )
+        if result.surface is not None:
+            self.quality_surface = result.surface
 
-        vault = (
-            res.get("Response", {})
-            .get("profileInventory", {})
-            .get("data", {})
-            .get("items", {})
-        )
+        if result.trash_df is None:
+            # Nothing changed, so the last results are still the ones shown.
+            if self.result_message is not None:
+                self.ui.write_to_status_bar(self.result_message)
+            self.ui.set_process_enabled_state(True)
+            return
 
-        character_inventories = (
-            res.get("Response", {}).get("characterInventories", {}).get("data", {})
-        )
+        # The slider moved while this run was scoring.
+        if result.params != self.get_filter_params() and self.show_surface_results():
+            return
+
+        self.show_results(result)
 
-        equipped = res.get("Response", {}).get("characterEquipment", {}).get("data", {})
+    def show_surface_results(self) -> bool:
+        # Re-selects the armor to delete for the current discipline target from
+        # the last scored surface, without running the pipeline again.
+        params = self.get_filter_params()
+        surface = self.quality_surface
+        if surface is None or not surface.matches(params):
+            return False
 
-        item_instances = (
-            res.get("Response", {})
-            .get("itemComponents", {})
-            .get("instances")
-            .get("data", {})
+        trash_df = self.armor_cleaner.filter_quality_surface(
+            surface, params.target_discipline, params.max_quality
         )
-        item_sockets = (
-            res.get("Response", {})
-            .get("itemComponents", {})
-            .get("sockets", {})
-            .get("data", {})
+        self.show_results(
+            RefreshResult(
+                params=params,
+                trash_df=trash_df,
+                armor_stats=self.collect_armor_stats(self.df, trash_df),
+            )
         )
+        return True
 
-        inventory = vault
-
-        for key in character_inventories:
-            inventory += character_inventories[key].get("items", [])
+    def start_app(self):
+        self.ui.show()
 
-        for key in equipped:
-            inventory += equipped[key].get("items", [])
+        # The last results are on screen before anything touches the network.
+        self.has_snapshot = self.load_snapshot()
+        self.ui.write_to_status_bar("Connecting to Bungie...")
 
-        item_dict = []
+        task = RefreshRunnable(
+            0, lambda report_progress: self.connect(), lambda generation: True
+        )
+        task.signals.finished.connect(self._on_connected)
+        task.signals.failed.connect(self._on_connect_failed)
+        self.refresh_pool.start(task)
 
-        for item in inventory:
-            item_hash = item.get("itemHash", None)
-            item_instance_id = item.get("itemInstanceId", None)
-            item_def = self.api.get_inventory_item_from_hash(item_hash)
+    def connect(self) -> tuple:
+        # Runs on the refresh pool, ahead of every profile fetch.
+        self.api.update_manifest()
+        if self.api.index is None:
+            self.api.preload()
 
-            item_type = item_def["itemType"]
+        self.api.set_auth_token(self.auth.authenticate())
+        return self.api.get_membership_for_user()
 
-            if item_type != 2:
-                continue
+    def _on_connected(self, generation: int, membership: tuple) -> None:
+        self.mem_id, self.mem_type = membership
 
-            item_tier = item_def.get("inventory", {}).get("tierTypeName", None)
-            item_sub_type = self.api.get_armor_subtype(item_hash)
-            item_equippable = self.api.get_class_type(item_hash)
+        self.handle_armor_refresh()
 
-            item_details = self.api.get_item_details_from_hash(item_hash)
-            item_name = item_details["name"]
+        self.refresh_timer = QTimer()
+        self.refresh_timer.timeout.connect(self.handle_armor_refresh)
+        self.refresh_timer.start(30 * 1000)
 
-            item_power = (
-                item_instances.get(item_instance_id, {})
-                .get("primaryStat", {})
-                .get("value", 0)
-            )
+    def _on_connect_failed(self, generation: int, message: str) -> None:
+        # The last snapshot can still be reviewed and re-filtered.
+        print(f"Could not reach Bungie, staying offline: {message}")
+        self.ui.write_to_status_bar(
+            "Offline, showing the last saved results."
+            if self.has_snapshot
+            else "Offline, and there are no saved results yet."
+        )
 
-            item_energy = (
-                item_instances.get(item_instance_id, {})
-                .get("energy", {})
-                .get("energyCapacity", 0)
+    def load_snapshot(self) -> bool:
+        snapshot = InventorySnapshot.load()
+        if snapshot is None:
+            return False
+
+        # The live refresh reconciles against this inventory, so only pieces
+        # acquired since the snapshot are enriched again.
+        self.df = snapshot.df
+        self.inventory.restore(snapshot.df)
+
+        params = self.get_filter_params()
+        self.show_results(
+            RefreshResult(
+                params=snapshot.params or params,
+                trash_df=snapshot.trash_df,
+                armor_stats=self.collect_armor_stats(snapshot.df, snapshot.trash_df),
             )
+        )
 
-            is_masterworked = True if item_energy == 10 else False
-
-            if item_tier == "Exotic":
-                is_artifice = True
-            else:
-                is_artifice = self.api.is_artifice(item_hash)
+        # The settings changed after the snapshot was saved, e.g. by moving the
+        # slider, so the saved selection is replaced by a local re-filter.
+        if snapshot.params != params:
+            self.start_refresh(fetch_profile=False)
 
-            if not item_def.get("collectibleHash"):
-                item_source_raw = item_def["displaySource"]
-            else:
-                item_source_raw = self.api.get_source_from_item_hash(item_hash)
+        return True
 
-            item_source = self.source_map.get(item_source_raw, None)
+    def fetch_profile(self) -> bytes:
+        assert self.mem_type is not None and self.mem_id is not None, ValueError(
+            "mem_type or mem_id is None"
+        )
 
-            item_statsheet = {
-                "Name": item_name,
-                "Hash": item_hash,
-                "Id": item_instance_id,
-                "Tier": item_tier,
-                "ItemSubType": item_sub_type,
-                "Source": item_source,
-                "Equippable": item_equippable,
-                "Power": item_power,
-                "Energy Capacity": item_energy,
-                "IsMasterworked": is_masterworked,
-                "IsArtifice": is_artifice,
-            }
+        return self.api.query_protected_endpoint_bytes(
+            f"https://www.bungie.net/Platform/Destiny2/"
+            f"{self.mem_type}/Profile/{self.mem_id}/"
+            "?components=102,201,205,300,302,304,305"
+        )
 
-            sockets = item_sockets.get(item_instance_id, {}).get("sockets", [])
-            item_base_stats = self.get_base_stats_from_id(sockets)
+    def create_armor_df(self, profile: ProfileData) -> pl.DataFrame:
+        # Base stats and definitions never change for an instance, so only
+        # pieces that are new since the last refresh are enriched.
+        new_items = profile.items.join(
+            self.inventory.df.select("Id"), on="Id", how="anti"
+        )
 
-            item_statsheet |= item_base_stats
+        base_stats = base_stats_from_sockets(
+            profile.sockets.join(new_items.select("Id"), on="Id", how="semi"),
+            self.api.get_intrinsic_plugs(),
+        )
+        profile_df = (
+            new_items.join(base_stats, on="Id", how="left")
+            .with_columns(pl.col([*STAT_COLS, "Total"]).fill_null(0))
+            .select(PROFILE_ARMOR_SCHEMA.names())
+        )
 
-            item_dict.append(item_statsheet)
+        self.inventory_changes = self.inventory.update(
+            profile.items.select(INSTANCE_ARMOR_SCHEMA.names()),
+            self.enrich_armor_df(profile_df),
+        )
 
-        dataframe = pl.DataFrame(item_dict).sort("Name")
+        return self.inventory.df
+
+    def enrich_armor_df(self, profile_df: pl.DataFrame) -> pl.DataFrame:
+        definitions = self.api.get_armor_definitions()
+
+        dataframe = (
+            profile_df.lazy()
+            .join(definitions.lazy(), on="Hash", how="inner")
+            .with_columns(
+                pl.col("SourceString")
+                .replace_strict(self.source_map, default=None, return_dtype=Source)
+                .alias("Source"),
+                (pl.col("Energy Capacity") == 10).alias("IsMasterworked"),
+                (
+                    pl.col("IsArtifice") | (pl.col("Tier") == "Exotic").fill_null(False)
+                ).alias("IsArtifice"),
+            )
+            .select(ARMOR_SCHEMA.names())
+            .sort("Name")
+            .collect()
+        )
 
         return dataframe
 
-    def get_base_stats_from_id(self, sockets):
-        stat_totals = {
-            "Mobility": 0,
-            "Resilience": 0,
-            "Recovery": 0,
-            "Discipline": 0,
-            "Intellect": 0,
-            "Strength": 0,
-            "Total": 0,
-        }
-
-        for plug in sockets:
-            if not plug["isEnabled"]:
-                continue
-            plug_hash = plug["plugHash"]
-
-            res = self.api.get_inventory_item_from_hash(plug_hash)
-
-            if res["plug"]["plugCategoryIdentifier"] != "intrinsics":
-                continue
-
-            investment_stats = res["investmentStats"]
-
-            for stat in investment_stats:
-                stat_type_hash = stat["statTypeHash"]
-                stat_data = self.api.get_destiny_stat_definition(stat_type_hash)
-
-                stat_name = stat_data["displayProperties"]["name"]
-                stat_value = stat["value"]
-                stat_totals[stat_name] += stat_value
-                stat_totals["Total"] += stat_value
-
-        return stat_totals
-
     def handle_disc_slider_change(self, value):
         self.target_discipline = value
         self.configur.set("values", "DEFAULT_DISC_TARGET", str(value))
         with open("config.ini", "w") as configfile:
             self.configur.write(configfile)
 
+        self.show_surface_results()
+
     def handle_quality_change(self, value):
         self.max_quality = value
         self.configur.set("values", "DEFAULT_MAX_QUALITY", str(value))
@@ -298,20 +436,22 @@ class AppController:
                     self.configur.write(configfile)
 
     def handle_process(self):
-        self.ui.set_process_enabled_state(False)
+        self.start_refresh(fetch_profile=False)
+
+    def show_results(self, result: RefreshResult):
+        # Icon tasks for the previous results are dropped before they start,
+        # and any that are already running report to a generation nobody
+        # listens to.
+        self.icon_generation += 1
+        self.thread_pool.clear()
 
         self.ui.clear_photo_grid()
         self.image_placeholders = {}
 
-        params = FilterParams(
-            target_discipline=self.target_discipline,
-            max_quality=self.max_quality,
-            ignore_common_armor=self.ignore_common_armor,
-            always_keep_highest_power=self.always_keep_highest_power,
-            build_flags=self.build_flags,
-        )
+        self.last_filter_params = result.params
+        self.armor_stats = result.armor_stats
 
-        trash_armor_df = self.armor_cleaner.filter_armor_items(self.df, params)
+        trash_armor_df = result.trash_df
         self.text_output = " or ".join(
             [f"id:{item}" for item in trash_armor_df["Id"].to_list()]
         )
@@ -320,75 +460,84 @@ class AppController:
 
         hash_list = trash_armor_df["Hash"].to_list()
 
-        os.makedirs("data/icons", exist_ok=True)
-
         self.hash_list = hash_list
         unique_hashes = list(set(hash_list))
         self.remaining_downloads = len(unique_hashes)
 
         if len(unique_hashes) == 0:
             self.ui.set_process_enabled_state(True)
-            self.ui.write_to_status_bar("There are no armor pieces to delete!")
+            self.result_message = "There are no armor pieces to delete!"
+            self.ui.write_to_status_bar(self.result_message)
             return
 
-        self.ui.write_to_status_bar(
-            f"Found {len(unique_hashes)} Armor Pieces to Delete."
-        )
-
-        skeleton_path = "src/assets/placeholder.png"
+        self.result_message = f"Found {len(unique_hashes)} Armor Pieces to Delete."
+        self.ui.write_to_status_bar(self.result_message)
 
-        num_cols = self.ui.image_grid.get_num_cols()
-        idx = 0
-        for row in trash_armor_df.iter_rows(named=True):
-            armor_id = row["Id"]
-            hash_value = row["Hash"]
-            row = idx // num_cols
-            col = idx % num_cols
+        placeholder = composite_pixmap(
+            "src/assets/placeholder.png", None, 96, self.ui.devicePixelRatioF()
+        )
 
-            placeholder = HoverImage(
-                base_pixmap_path=skeleton_path,
-                overlay_pixmap_path=None,
-                image_size=96,
-                tooltip_title="Loading...",
-                tooltip_body="Fetching item details...",
+        grid_items = []
+        for row, (armor_id, hash_value) in enumerate(
+            trash_armor_df.select("Id", "Hash").iter_rows()
+        ):
+            grid_items.append(
+                ArmorGridItem(
+                    armor_id=armor_id, hash_value=hash_value, pixmap=placeholder
+                )
             )
+            self.image_placeholders.setdefault(hash_value, []).append((row, armor_id))
 
-            self.ui.add_to_grid_at_coords(placeholder, row, col)
-            self.image_placeholders[(hash_value, armor_id, row, col)] = placeholder
-
-            idx += 1
+        self.ui.set_grid_items(grid_items)
 
         for hash_value in unique_hashes:
-            task = IconLoaderRunnable(hash_value, self.api)
+            # Icons composited for earlier results are reused straight from the
+            # cache, which keeps slider drags from reloading the whole grid.
+            cache_key = self.icon_cache_keys.get(hash_value)
+            pixmap = QPixmapCache.find(cache_key) if cache_key else None
+            if pixmap is not None:
+                self.remaining_downloads -= 1
+                self.apply_icon(hash_value, pixmap)
+                continue
+
+            task = IconLoaderRunnable(
+                hash_value,
+                self.api,
+                self.icon_store,
+                image_size=96,
+                device_pixel_ratio=self.ui.devicePixelRatioF(),
+                generation=self.icon_generation,
+                is_current=lambda generation: generation == self.icon_generation,
+            )
             task.signals.finished.connect(self._on_runner_finished)
             self.thread_pool.start(task)
 
-    def get_armor_stats(self, armor_id: str) -> str:
-        row = self.df.filter(pl.col("Id") == armor_id)
+        if self.remaining_downloads == 0:
+            self.ui.set_process_enabled_state(True)
+            self.icon_store.flush()
 
-        if row.is_empty():
+    def get_filter_params(self) -> FilterParams:
+        return FilterParams(
+            target_discipline=self.target_discipline,
+            max_quality=self.max_quality,
+            ignore_common_armor=self.ignore_common_armor,
+            always_keep_highest_power=self.always_keep_highest_power,
+            build_flags=copy.deepcopy(self.build_flags),
+        )
+
+    def get_armor_stats(self, armor_id: int) -> str:
+        stats = self.armor_stats.get(armor_id)
+
+        if stats is None:
             return "Stats not found."
 
-        stats = row.select(
-            [
-                pl.col("Mobility"),
-                pl.col("Resilience"),
-                pl.col("Recovery"),
-                pl.col("Discipline"),
-                pl.col("Intellect"),
-                pl.col("Strength"),
-            ]
-        ).to_dicts()[0]
+        rows = "".join(
+            f"<tr><td>{stat_name}</td><td>{self.value_to_bar(value)}</td></tr>"
+            for stat_name, value in zip(STAT_COLS, stats)
+        )
 
         return (
-            "<table style='font-family: sans-serif; font-size: 10pt;'>"
-            f"<tr><td>Mobility</td><td>{self.value_to_bar(stats['Mobility'])}</td></tr>"
-            f"<tr><td>Resilience</td><td>{self.value_to_bar(stats['Resilience'])}</td></tr>"
-            f"<tr><td>Recovery</td><td>{self.value_to_bar(stats['Recovery'])}</td></tr>"
-            f"<tr><td>Discipline</td><td>{self.value_to_bar(stats['Discipline'])}</td></tr>"
-            f"<tr><td>Intellect</td><td>{self.value_to_bar(stats['Intellect'])}</td></tr>"
-            f"<tr><td>Strength</td><td>{self.value_to_bar(stats['Strength'])}</td></tr>"
-            "</table>"
+            f"<table style='font-family: sans-serif; font-size: 10pt;'>{rows}</table>"
         )
 
     def value_to_bar(self, value, max_val=44, bar_length=22):
@@ -403,34 +552,32 @@ class AppController:
             f"<span style='color: #ccc;'>{'█' * empty_blocks}</span> {value}</span>"
         )
 
-    def _handle_item_loaded(self, image_path, overlay_path, item_data):
-        self.ui.add_to_photo_grid(
-            image_path=image_path, overlay_path=overlay_path, item_data=item_data
-        )
+    def _on_runner_finished(
+        self, generation: int, hash_value: str, cache_key: str, image: QImage
+    ):
+        if generation != self.icon_generation:
+            return
 
-    def _on_runner_finished(self, hash_value):
         self.remaining_downloads -= 1
 
         if self.remaining_downloads == 0:
             self.ui.set_process_enabled_state(True)
+            self.icon_store.flush()
+
+        pixmap = pixmap_from_image(cache_key, image)
+        if not pixmap.isNull():
+            self.icon_cache_keys[int(hash_value)] = cache_key
 
-        image_path = f"data/icons/{hash_value}.png"
-        overlay_path = f"data/icons/{hash_value}_overlay.png"
+        self.apply_icon(int(hash_value), pixmap)
+
+    def apply_icon(self, hash_value: int, pixmap: QPixmap) -> None:
         item_data = self.api.get_item_details_from_hash(hash_value)
 
-        for key, label in list(self.image_placeholders.items()):
-            key_hash, armor_id, _, _ = key
-            if str(key_hash) == hash_value:
-                stats_block = self.get_armor_stats(armor_id)
-
-                new_label = HoverImage(
-                    base_pixmap_path=image_path,
-                    overlay_pixmap_path=overlay_path,
-                    image_size=96,
-                    tooltip_title=item_data["name"],
-                    tooltip_body=item_data["flavorText"],
-                    tooltip_stats=stats_block,
-                    armor_id=armor_id,
-                )
-                self.ui.image_grid.replaceWidget(label, new_label)
-                label.deleteLater()
+        for row, armor_id in self.image_placeholders.get(hash_value, []):
+            self.ui.update_grid_item(
+                row=row,
+                pixmap=pixmap,
+                tooltip_title=item_data["name"],
+                tooltip_body=item_data["flavorText"],
+                tooltip_stats=self.get_armor_stats(armor_id),
+            )
@@ -1,94 +1,169 @@
-import datetime
 import json
 import os
-import sqlite3
-import zipfile
+from collections.abc import Container
 
+import polars as pl
 import requests
 from dotenv import load_dotenv
 
-
-item_subtype_map = {
-    26: "HelmetArmor",
-    27: "GauntletsArmor",
-    28: "ChestArmor",
-    29: "LegArmor",
-    30: "ClassArmor",
-}
-
-class_type_map = {
-    0: "Titan",
-    1: "Hunter",
-    2: "Warlock",
-    3: "Unknown",
-}
+from src.armor_schema import class_type_map, item_subtype_map
+from src.icon_fetcher import IconFetcher
+from src.manifest_db import ManifestDatabase
+from src.manifest_download import (
+    download_to_file,
+    extract_single_member,
+    manifest_lock,
+    remove_orphaned_downloads,
+)
+from src.manifest_index import (
+    ManifestIndex,
+    has_artifice_socket,
+    has_projection,
+)
+from src.manifest_version import ManifestVersion
 
 
 class ManifestBrowser:
-    def __init__(self) -> None:
+    def __init__(self, preload: bool = False) -> None:
         load_dotenv()
 
         self.BUNGIE_API_KEY = os.getenv("BUNGIE_API_KEY")
+        self.MANIFEST_URL = "https://www.bungie.net/Platform/Destiny2/Manifest/"
         self.MANIFEST_STORAGE_DIR = os.path.join("data", "manifest")
+        self.MANIFEST_VERSION_PATH = os.path.join(
+            self.MANIFEST_STORAGE_DIR, "manifest-version.json"
+        )
         self.headers = {"X-API-KEY": self.BUNGIE_API_KEY}
 
         self.cached_item_defs: dict[int, dict] = {}
         self.cached_stat_defs = {}
         self.cached_source_hashes: dict[int, str] = {}
+        self.index: ManifestIndex | None = None
+        self.db = ManifestDatabase(
+            os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
+        )
+
+        self.icon_fetcher = IconFetcher()
 
         self.auth_token = None
 
         if not os.path.isdir(self.MANIFEST_STORAGE_DIR):
             os.makedirs(self.MANIFEST_STORAGE_DIR)
 
-        if not os.path.isfile(
-            os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
-        ):
-            self.get_manifest()
-
-        with open(
-            os.path.join(self.MANIFEST_STORAGE_DIR, "last-download-date"), "r"
-        ) as file:
-            download_date = datetime.datetime.strptime(
-                file.read(), "%Y-%m-%d %H:%M:%S.%f"
-            )
-
-        if datetime.datetime.now() - download_date > datetime.timedelta(hours=24):
-            self.get_manifest()
+        # Only the memory-mapped projection is loaded up front. Checking for a
+        # new manifest and building a missing projection are left to
+        # update_manifest and preload, which the controller runs off the GUI
+        # thread.
+        if preload:
+            self.load_projection()
 
     def set_auth_token(self, auth_token):
         self.auth_token = auth_token
 
-    def get_manifest(self):
-        manifest_url = "http://www.bungie.net/Platform/Destiny2/Manifest/"
+    def update_manifest(self) -> None:
+        manifest_path = os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
+        local_version = ManifestVersion.load(self.MANIFEST_VERSION_PATH)
+        has_local = local_version is not None and os.path.isfile(manifest_path)
+
+        headers = dict(self.headers)
+        if has_local:
+            headers |= local_version.conditional_headers()
+
+        try:
+            r = requests.get(self.MANIFEST_URL, headers=headers, timeout=30)
+            if r.status_code == 304 and has_local:
+                return
+
+            r.raise_for_status()
+            remote_version = ManifestVersion.from_response(r)
+
+            if has_local and local_version.same_content(remote_version):
+                # Keep the newest validators so the next check can be answered
+                # with 304.
+                remote_version.save(self.MANIFEST_VERSION_PATH)
+                return
+
+            self.get_manifest(remote_version)
+        except (requests.RequestException, KeyError, ValueError, TimeoutError) as e:
+            if not os.path.isfile(manifest_path):
+                raise
+            print(f"Manifest update failed, using local copy: {e}")
+
+    def get_manifest(self, version: ManifestVersion | None = None):
+        manifest_path = os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
+
+        with manifest_lock(os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.lock")):
+            remove_orphaned_downloads(self.MANIFEST_STORAGE_DIR, keep=manifest_path)
+
+            if version is None:
+                r = requests.get(self.MANIFEST_URL, headers=self.headers, timeout=30)
+                r.raise_for_status()
+                version = ManifestVersion.from_response(r)
+
+            # Another instance may have swapped in this version while we waited.
+            local_version = ManifestVersion.load(self.MANIFEST_VERSION_PATH)
+            if (
+                local_version is None
+                or not local_version.same_content(version)
+                or not os.path.isfile(manifest_path)
+            ):
+                mani_url = f"https://www.bungie.net{version.content_path}"
+
+                print(mani_url)
+
+                zip_path = download_to_file(
+                    mani_url, self.MANIFEST_STORAGE_DIR, self.headers
+                )
+                print("Download Complete")
+
+                try:
+                    self.db.close()
+                    extract_single_member(zip_path, manifest_path)
+                finally:
+                    os.remove(zip_path)
+                print("Unzipped")
+
+            version.save(self.MANIFEST_VERSION_PATH)
+
+        self.db.close()
+        self.index = None
+        self.preload()
+
+    def load_projection(self) -> bool:
+        manifest_path = os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
+        if not os.path.isfile(manifest_path) or not has_projection(
+            self.MANIFEST_STORAGE_DIR, newer_than=manifest_path
+        ):
+            return False
+
+        self.index = ManifestIndex.from_projection(self.MANIFEST_STORAGE_DIR)
+        return True
+
+    def preload(self) -> None:
+        if self.load_projection():
+            return
+
+        with self.db.connection() as con:
+            self.index = ManifestIndex.from_connection(con)
+        self.index.write_projection(self.MANIFEST_STORAGE_DIR)
 
-        r = requests.get(manifest_url, headers=self.headers)
-        manifest = r.json()
-        mani_url = f"https://www.bungie.net{manifest['Response']['mobileWorldContentPaths']['en']}"
+    def get_armor_definitions(self) -> pl.DataFrame:
+        if self.index is None:
+            self.preload()
 
-        print(mani_url)
+        return self.index.armor_frame
 
-        r = requests.get(mani_url, headers=self.headers)
+    def get_armor_hashes(self) -> Container[int]:
+        if self.index is None:
+            self.preload()
 
-        with open(os.path.join(self.MANIFEST_STORAGE_DIR, "MANZIP"), "wb") as zipped:
-            zipped.write(r.content)
-        print("Download Complete")
+        return self.index.armor_rows.keys()
 
-        with zipfile.ZipFile(
-            os.path.join(self.MANIFEST_STORAGE_DIR, "MANZIP")
-        ) as zipped:
-            name = zipped.namelist()
-            zipped.extractall()
-        if os.path.exists(os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")):
-            os.remove(os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content"))
-        os.rename(name[0], os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content"))
-        print("Unzipped")
+    def get_intrinsic_plugs(self) -> pl.DataFrame:
+        if self.index is None:
+            self.preload()
 
-        ct = datetime.datetime.now()
-        with open(
-            os.path.join(self.MANIFEST_STORAGE_DIR, "last-download-date"), "w"
-        ) as file:
-            file.write(str(ct))
+        return self.index.plug_frame
 
     def get_inventory_item_from_hash(self, hash_value: int):
         if hash_value in self.cached_item_defs:
@@ -96,12 +171,9 @@ class ManifestBrowser:
 
         id_val = self.correct_hash_sign(hash_value)
 
-        con = sqlite3.connect(
-            os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
+        items = self.db.fetch_all(
+            "SELECT * FROM DestinyInventoryItemDefinition WHERE id=?;", (id_val,)
         )
-        cur = con.cursor()
-        cur.execute(f"SELECT * FROM DestinyInventoryItemDefinition WHERE id={id_val};")
-        items = cur.fetchall()
 
         if len(items) > 1:
             raise ValueError(f"db call returned more than 1 result: {len(items)}")
@@ -129,12 +201,9 @@ class ManifestBrowser:
 
         id_val = self.correct_hash_sign(collectible_hash)
 
-        con = sqlite3.connect(
-            os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
+        items = self.db.fetch_all(
+            "SELECT * FROM DestinyCollectibleDefinition WHERE id=?;", (id_val,)
         )
-        cur = con.cursor()
-        cur.execute(f"SELECT * FROM DestinyCollectibleDefinition WHERE id={id_val};")
-        items = cur.fetchall()
 
         if len(items) > 1:
             raise ValueError(f"db call returned more than 1 result: {len(items)}")
@@ -156,12 +225,9 @@ class ManifestBrowser:
         else:
             id_val = self.correct_hash_sign(hash_value)
 
-            con = sqlite3.connect(
-                os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
+            items = self.db.fetch_all(
+                "SELECT * FROM DestinyStatDefinition WHERE id=?;", (id_val,)
             )
-            cur = con.cursor()
-            cur.execute(f"SELECT * FROM DestinyStatDefinition WHERE id={id_val};")
-            items = cur.fetchall()
 
             if len(items) > 1:
                 raise ValueError(f"db call returned more than 1 result: {len(items)}")
@@ -187,24 +253,7 @@ class ManifestBrowser:
     def is_artifice(self, hash_value: int) -> bool:
         json_data = self.get_inventory_item_from_hash(hash_value)
 
-        socket_categories = json_data.get("sockets", {}).get("socketCategories", {})
-
-        perk_indices = []
-
-        for socket in socket_categories:
-            if (
-                socket.get("socketCategoryHash", 0) != 3154740035
-            ):  # Armor Perks Category
-                continue
-
-            perk_indices = socket["socketIndexes"]
-
-        socket_entries = json_data.get("sockets", {}).get("socketEntries", {})
-        for perk_index in perk_indices:
-            if socket_entries[perk_index]["singleInitialItemHash"] == 3727270518:
-                # value refers to artifice armor mod. MIGHT CHANGE
-                return True
-        return False
+        return has_artifice_socket(json_data)
 
     def get_class_type(self, hash_value: int) -> str:
         json_data = self.get_inventory_item_from_hash(hash_value)
@@ -223,6 +272,14 @@ class ManifestBrowser:
         return item_rarity
 
     def get_item_details_from_hash(self, hash_value: int):
+        if self.index is not None:
+            armor_def = self.index.armor_definition(hash_value)
+            if armor_def is not None:
+                return {
+                    "name": armor_def["Name"],
+                    "flavorText": armor_def["FlavorText"],
+                }
+
         json_data = self.get_inventory_item_from_hash(hash_value)
 
         item_data = {}
@@ -231,21 +288,16 @@ class ManifestBrowser:
 
         return item_data
 
-    def get_item_icon_from_hash(self, hash_value: int, file_name: str):
-        json_data = self.get_inventory_item_from_hash(hash_value)
-
-        icon_url = f"https://www.bungie.net{json_data['displayProperties']['icon']}"
-        overlay_url = f"https://www.bungie.net{json_data['iconWatermark']}"
-        query_params = {"downloadFormat": "png"}
-        res = requests.get(icon_url, params=query_params)
+    def get_item_icon_paths(self, hash_value: int) -> tuple[str | None, str | None]:
+        if self.index is not None:
+            armor_def = self.index.armor_definition(hash_value)
+            if armor_def is not None:
+                return armor_def["Icon"], armor_def["IconWatermark"]
 
-        with open(file_name, mode="wb") as file:
-            file.write(res.content)
-
-        res = requests.get(overlay_url, params=query_params)
-
-        with open(f"{file_name.removesuffix('.png')}_overlay.png", mode="wb") as file:
-            file.write(res.content)
+        json_data = self.get_inventory_item_from_hash(hash_value)
+        return json_data["displayProperties"].get("icon"), json_data.get(
+            "iconWatermark"
+        )
 
     def get_membership_for_user(self):
         url = "https://www.bungie.net/Platform/User/GetMembershipsForCurrentUser/"
@@ -254,7 +306,8 @@ class ManifestBrowser:
             "Authorization": f"Bearer {self.auth_token}",
         }
 
-        res = requests.get(url, headers=headers)
+        res = requests.get(url, headers=headers, timeout=30)
+        res.raise_for_status()
 
         data = res.json()["Response"]
 
@@ -273,32 +326,25 @@ class ManifestBrowser:
 
         return mem_id, mem_type
 
-    def query_protected_endpoint(self, endpoint):
+    def query_protected_endpoint_bytes(self, endpoint) -> bytes:
+        # Leaves decoding to the caller, so large responses never pass through a
+        # full dict of the payload.
         headers = {
             "X-API-Key": self.BUNGIE_API_KEY,
             "Authorization": f"Bearer {self.auth_token}",
         }
-        res = requests.get(endpoint, headers=headers)
-        return res.json()
+        res = requests.get(endpoint, headers=headers, timeout=30)
+        res.raise_for_status()
+        return res.content
 
     def get_table_names(self) -> list[str]:
-        con = sqlite3.connect(
-            os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
-        )
-        cur = con.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table';")
-
-        tables = cur.fetchall()
+        tables = self.db.fetch_all("SELECT name FROM sqlite_master WHERE type='table';")
         return [table[0] for table in tables]
 
     def get_table_attributes(self, table_name: str):
-        con = sqlite3.connect(
-            os.path.join(self.MANIFEST_STORAGE_DIR, "manifest.content")
+        columns = self.db.fetch_all(
+            "SELECT * FROM pragma_table_info(?);", (table_name,)
         )
-        cur = con.cursor()
-        cur.execute(f"PRAGMA table_info({table_name});")
-
-        columns = cur.fetchall()
 
         attributes = []
         for col in columns:
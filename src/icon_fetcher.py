@@ -0,0 +1,78 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class IconFetcher:
+    def __init__(
+        self,
+        pool_size: int = 8,
+        timeout: tuple[float, float] = (5, 30),
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+    ) -> None:
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+
+        # One keep-alive session shared by every icon worker thread.
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+
+    def fetch(self, url: str) -> bytes:
+        # Watermarks are shared by every item in a season, so concurrent requests
+        # for the same URL wait on the first download instead of repeating it.
+        with self._lock:
+            future = self._in_flight.get(url)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._in_flight[url] = future
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            res = self.session.get(
+                url, params={"downloadFormat": "png"}, timeout=self.timeout
+            )
+            res.raise_for_status()
+            future.set_result(res.content)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(url, None)
+
+        return future.result()
+
+    def download(self, url: str, path: str) -> None:
+        content = self.fetch(url)
+
+        # Written atomically so a half-written icon is never picked up as cached.
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), suffix=".png"
+        )
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
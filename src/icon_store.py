@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+
+from src.icon_fetcher import IconFetcher
+
+
+INDEX_FILE = "index.json"
+
+
+class IconStore:
+    def __init__(
+        self,
+        fetcher: IconFetcher,
+        directory: str = os.path.join("data", "icons"),
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.fetcher = fetcher
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # icon path -> {"file": str, "size": int}, ordered from least to most
+        # recently used. The order survives the round trip through the index.
+        self.entries: dict[str, dict] = {}
+        # The index is written by flush(), once per batch of downloads.
+        self.dirty = False
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.load_index()
+        self.prune_untracked_files()
+
+    def file_name(self, icon_path: str) -> str:
+        # Keyed by the manifest path, so a watermark shared by a whole season is
+        # stored once no matter how many item hashes point at it.
+        return hashlib.sha1(icon_path.encode()).hexdigest() + ".png"
+
+    def path_for(self, icon_path: str | None) -> str | None:
+        if not icon_path:
+            return None
+
+        return os.path.join(self.directory, self.file_name(icon_path))
+
+    def get(self, icon_path: str | None) -> str | None:
+        if not icon_path:
+            return None
+
+        with self._lock:
+            entry = self.entries.pop(icon_path, None)
+            if entry is None:
+                return None
+            self.entries[icon_path] = entry
+
+        path = os.path.join(self.directory, entry["file"])
+        return path if os.path.isfile(path) else None
+
+    def ensure(self, icon_path: str | None) -> str | None:
+        if not icon_path:
+            return None
+
+        path = self.get(icon_path)
+        if path is not None:
+            return path
+
+        path = self.path_for(icon_path)
+        self.fetcher.download(f"https://www.bungie.net{icon_path}", path)
+
+        with self._lock:
+            self.entries[icon_path] = {
+                "file": self.file_name(icon_path),
+                "size": os.path.getsize(path),
+            }
+            self.evict()
+            self.dirty = True
+
+        return path
+
+    def evict(self) -> None:
+        total = sum(entry["size"] for entry in self.entries.values())
+        if total <= self.max_bytes:
+            return
+
+        for icon_path, entry in list(self.entries.items()):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except FileNotFoundError:
+                pass
+
+            total -= entry["size"]
+            del self.entries[icon_path]
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self.dirty:
+                return
+            self.write_index()
+            self.dirty = False
+
+    def load_index(self) -> None:
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), "r") as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def write_index(self) -> None:
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        temp_path = f"{index_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.entries, file)
+        os.replace(temp_path, index_path)
+
+    def prune_untracked_files(self) -> None:
+        # Removes icons from the old per-hash layout and leftovers of interrupted
+        # downloads, so the cap covers everything in the directory.
+        tracked = {entry["file"] for entry in self.entries.values()}
+        tracked.add(INDEX_FILE)
+
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name not in tracked and os.path.isfile(path):
+                os.remove(path)
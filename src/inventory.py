@@ -0,0 +1,62 @@
+from dataclasses import dataclass, field
+
+import polars as pl
+
+from src.armor_schema import ARMOR_SCHEMA
+
+
+@dataclass
+class InventoryChanges:
+    added: list[int] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+    updated: list[int] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.updated)
+
+
+class ArmorInventory:
+    def __init__(self) -> None:
+        self.df = pl.DataFrame(schema=ARMOR_SCHEMA)
+        self.ids: set[int] = set()
+
+    def restore(self, df: pl.DataFrame) -> None:
+        self.df = df
+        self.ids = set(df["Id"].to_list())
+
+    def update(
+        self, instances: pl.DataFrame, added_df: pl.DataFrame
+    ) -> InventoryChanges:
+        # `instances` holds Id, Power and Energy Capacity for every armor piece in
+        # the profile. `added_df` holds fully enriched rows for the ids that were
+        # not in the inventory yet, so only those pay for socket and definition
+        # lookups.
+        current_ids = set(instances["Id"].to_list())
+
+        changes = InventoryChanges(
+            added=sorted(set(added_df["Id"].to_list()) - self.ids),
+            removed=sorted(self.ids - current_ids),
+        )
+
+        kept = self.df.join(
+            instances, on="Id", how="inner", suffix=" New"
+        ).with_columns(
+            (
+                (pl.col("Power") != pl.col("Power New"))
+                | (pl.col("Energy Capacity") != pl.col("Energy Capacity New"))
+            ).alias("Changed")
+        )
+        changes.updated = sorted(kept.filter(pl.col("Changed"))["Id"].to_list())
+
+        kept = kept.with_columns(
+            pl.col("Power New").alias("Power"),
+            pl.col("Energy Capacity New").alias("Energy Capacity"),
+            (pl.col("Energy Capacity New") == 10).alias("IsMasterworked"),
+        ).select(ARMOR_SCHEMA.names())
+
+        self.df = pl.concat(
+            [kept, added_df.filter(pl.col("Id").is_in(changes.added))]
+        ).sort(["Name", "Id"])
+        self.ids = set(self.df["Id"].to_list())
+
+        return changes
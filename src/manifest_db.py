@@ -0,0 +1,83 @@
+import os
+import pathlib
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class ManifestDatabase:
+    def __init__(
+        self, path: str, cached_statements: int = 64, max_connections: int = 4
+    ) -> None:
+        self.path = path
+        self.cached_statements = cached_statements
+        self.max_connections = max_connections
+
+        # A fixed pool shared by every thread. Pool threads come and go, so
+        # connections are never tied to the thread that opened them.
+        self._available = threading.Condition()
+        self._idle: list[sqlite3.Connection] = []
+        self._open = 0
+        self._generation = 0
+
+    def open_connection(self) -> sqlite3.Connection:
+        # The manifest is never written to while the app runs, so connections are
+        # read-only and immutable, which lets SQLite skip locking entirely.
+        uri = pathlib.Path(os.path.abspath(self.path)).as_uri()
+        con = sqlite3.connect(
+            f"{uri}?mode=ro&immutable=1",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        con.execute(f"PRAGMA mmap_size={os.path.getsize(self.path)};")
+        return con
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._available:
+            while not self._idle and self._open >= self.max_connections:
+                self._available.wait()
+
+            generation = self._generation
+            con = self._idle.pop() if self._idle else None
+            if con is None:
+                self._open += 1
+
+        if con is None:
+            try:
+                con = self.open_connection()
+            except BaseException:
+                with self._available:
+                    self._open -= 1
+                    self._available.notify()
+                raise
+
+        try:
+            yield con
+        finally:
+            with self._available:
+                if generation == self._generation:
+                    self._idle.append(con)
+                else:
+                    # Checked out before the manifest was replaced.
+                    con.close()
+                    self._open -= 1
+                self._available.notify()
+
+    def fetch_all(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self.connection() as con:
+            return con.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        # Must be called before the manifest file is replaced. Connections in use
+        # are closed as soon as they are handed back, and the next query opens a
+        # fresh one.
+        with self._available:
+            for con in self._idle:
+                con.close()
+            self._open -= len(self._idle)
+            self._idle = []
+            self._generation += 1
+            self._available.notify_all()
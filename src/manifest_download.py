@@ -0,0 +1,156 @@
+import ctypes
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+
+import requests
+
+
+CHUNK_SIZE = 1 << 20
+UNCLAIMED_LOCK_GRACE = 30
+
+
+def process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows, so ask the kernel.
+        process_query_limited_information = 0x1000
+        still_active = 259
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == still_active
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def lock_owner(path: str) -> int | None:
+    with open(path, "r") as file:
+        try:
+            return int(file.read())
+        except ValueError:
+            return None
+
+
+def take_over_if_stale(path: str) -> bool:
+    # Returns whether the lock is gone and creating it should be retried.
+    try:
+        before = os.stat(path)
+        owner = lock_owner(path)
+        if owner is None:
+            # Only an owner that died between creating the lock and writing its
+            # pid leaves it empty for long.
+            if time.time() - before.st_mtime < UNCLAIMED_LOCK_GRACE:
+                return False
+        elif owner == os.getpid() or process_alive(owner):
+            return False
+
+        # Renaming is atomic, so of several waiters that judged the lock stale
+        # only one moves it away. The others see it missing and retry.
+        claimed = f"{path}.{os.getpid()}.stale"
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return True
+
+    after = os.stat(claimed)
+    if (after.st_ino, after.st_mtime_ns) != (before.st_ino, before.st_mtime_ns):
+        # A new owner created the lock between the check and the rename, so
+        # its live lock is put back without clobbering any newer one.
+        try:
+            os.link(claimed, path)
+        except OSError:
+            pass
+        os.remove(claimed)
+        return False
+
+    os.remove(claimed)
+    return True
+
+
+@contextmanager
+def manifest_lock(path: str, timeout: float = 600):
+    # O_EXCL creation is atomic on every platform we ship on, so only one app
+    # instance gets to download and swap the manifest at a time. A lock is only
+    # taken over once its owner has exited, however long a download takes.
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if take_over_if_stale(path):
+                continue
+
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for manifest lock: {path}")
+            time.sleep(0.5)
+
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_orphaned_downloads(directory: str, keep: str) -> None:
+    # Temp archives and extractions left behind by an instance that crashed
+    # mid-download. Only call this while holding the manifest lock.
+    keep = os.path.abspath(keep)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith((".zip", ".content")) and os.path.abspath(path) != keep:
+            os.remove(path)
+
+
+def download_to_file(url: str, directory: str, headers: dict) -> str:
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".zip")
+    try:
+        with (
+            os.fdopen(fd, "wb") as file,
+            requests.get(url, headers=headers, stream=True, timeout=60) as r,
+        ):
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                file.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return temp_path
+
+
+def extract_single_member(zip_path: str, target_path: str) -> None:
+    # Extract next to the target so the final os.replace stays on one filesystem
+    # and readers never see a partially written manifest.
+    directory = os.path.dirname(os.path.abspath(target_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".content")
+    try:
+        with (
+            os.fdopen(fd, "wb") as dest,
+            zipfile.ZipFile(zip_path) as zipped,
+            zipped.open(zipped.namelist()[0]) as source,
+        ):
+            shutil.copyfileobj(source, dest, CHUNK_SIZE)
+
+        os.replace(temp_path, target_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,257 @@
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any
+
+import polars as pl
+
+from src.armor_schema import (
+    STAT_DTYPE,
+    TIER_NAMES,
+    ClassType,
+    ItemSubType,
+    Tier,
+    class_type_map,
+    item_subtype_map,
+)
+
+
+ARMOR_PERKS_SOCKET_CATEGORY = 3154740035
+ARTIFICE_PERK_PLUG = 3727270518
+
+ARMOR_STATS = [
+    "Mobility",
+    "Resilience",
+    "Recovery",
+    "Discipline",
+    "Intellect",
+    "Strength",
+]
+
+ARMOR_DEFINITIONS_FILE = "armor_definitions.arrow"
+INTRINSIC_PLUGS_FILE = "intrinsic_plugs.arrow"
+PROJECTION_VERSION_FILE = "projection-version.json"
+
+# Bump whenever the projected columns or how they are derived change, so
+# projections written by an older build are rebuilt instead of reused.
+PROJECTION_VERSION = 2
+
+ARMOR_DEFINITIONS_SCHEMA = pl.Schema(
+    {
+        "Hash": pl.UInt32,
+        "Name": pl.String,
+        "FlavorText": pl.String,
+        "Icon": pl.String,
+        "IconWatermark": pl.String,
+        "ItemSubType": ItemSubType,
+        "Equippable": ClassType,
+        "Tier": Tier,
+        "SourceString": pl.String,
+        "IsArtifice": pl.Boolean,
+    }
+)
+
+INTRINSIC_PLUGS_SCHEMA = pl.Schema(
+    {"PlugHash": pl.UInt32} | {stat: STAT_DTYPE for stat in ARMOR_STATS}
+)
+
+
+@dataclass
+class ManifestIndex:
+    # hash -> row of armor_frame. The definitions themselves stay columnar.
+    armor_rows: dict[int, int] = field(default_factory=dict)
+    stat_names: dict[int, str] = field(default_factory=dict)
+
+    armor_frame: pl.DataFrame = field(
+        default_factory=lambda: pl.DataFrame(schema=ARMOR_DEFINITIONS_SCHEMA)
+    )
+    plug_frame: pl.DataFrame = field(
+        default_factory=lambda: pl.DataFrame(schema=INTRINSIC_PLUGS_SCHEMA)
+    )
+
+    @classmethod
+    def from_connection(cls, con: sqlite3.Connection) -> "ManifestIndex":
+        index = cls()
+        cur = con.cursor()
+
+        cur.execute(
+            "SELECT id, json_extract(CAST(json AS TEXT), '$.displayProperties.name') "
+            "FROM DestinyStatDefinition;"
+        )
+        index.stat_names = {unsigned_hash(id_val): name for id_val, name in cur}
+
+        cur.execute(
+            "SELECT id, json_extract(CAST(json AS TEXT), '$.sourceString') "
+            "FROM DestinyCollectibleDefinition;"
+        )
+        collectible_sources = {
+            unsigned_hash(id_val): source or "" for id_val, source in cur
+        }
+
+        cur.execute(
+            "SELECT id, json_extract(CAST(json AS TEXT), '$.investmentStats') "
+            "FROM DestinyInventoryItemDefinition "
+            "WHERE json_extract(CAST(json AS TEXT), '$.plug.plugCategoryIdentifier')"
+            " = 'intrinsics';"
+        )
+        plug_rows = []
+        for id_val, investment_stats in cur:
+            stats: dict[str, int] = {}
+            for stat in json.loads(investment_stats or "[]"):
+                stat_name = index.stat_names.get(stat["statTypeHash"])
+                if stat_name is None:
+                    continue
+                stats[stat_name] = stats.get(stat_name, 0) + stat["value"]
+            plug_rows.append(
+                [unsigned_hash(id_val), *[stats.get(stat, 0) for stat in ARMOR_STATS]]
+            )
+
+        cur.execute(
+            "SELECT id, json FROM DestinyInventoryItemDefinition "
+            "WHERE json_extract(CAST(json AS TEXT), '$.itemType') = 2;"
+        )
+        armor_rows = []
+        for id_val, raw_json in cur:
+            json_data = json.loads(raw_json)
+
+            collectible_hash = json_data.get("collectibleHash")
+            if not collectible_hash:
+                source_string = json_data.get("displaySource", "")
+            else:
+                source_string = collectible_sources.get(collectible_hash, "")
+
+            # Tiers outside the enum (e.g. "" or "Currency") become null, like
+            # unknown subtypes and classes become "None".
+            tier = json_data.get("inventory", {}).get("tierTypeName")
+            if tier not in TIER_NAMES:
+                tier = None
+
+            armor_rows.append(
+                [
+                    unsigned_hash(id_val),
+                    json_data["displayProperties"]["name"],
+                    json_data.get("flavorText", ""),
+                    json_data["displayProperties"].get("icon"),
+                    json_data.get("iconWatermark"),
+                    item_subtype_map.get(json_data["itemSubType"], "None"),
+                    class_type_map.get(json_data["classType"], "None"),
+                    tier,
+                    source_string,
+                    has_artifice_socket(json_data),
+                ]
+            )
+
+        index.armor_frame = pl.DataFrame(
+            armor_rows, schema=ARMOR_DEFINITIONS_SCHEMA, orient="row"
+        )
+        index.index_armor_rows()
+        index.plug_frame = pl.DataFrame(
+            plug_rows, schema=INTRINSIC_PLUGS_SCHEMA, orient="row"
+        )
+
+        return index
+
+    @classmethod
+    def from_projection(cls, directory: str) -> "ManifestIndex":
+        index = cls()
+
+        index.armor_frame = pl.read_ipc(
+            os.path.join(directory, ARMOR_DEFINITIONS_FILE), memory_map=True
+        )
+        index.plug_frame = pl.read_ipc(
+            os.path.join(directory, INTRINSIC_PLUGS_FILE), memory_map=True
+        )
+
+        index.index_armor_rows()
+
+        return index
+
+    def index_armor_rows(self) -> None:
+        self.armor_rows = {
+            hash_value: row
+            for row, hash_value in enumerate(self.armor_frame["Hash"].to_list())
+        }
+
+    def armor_definition(self, hash_value: int) -> dict[str, Any] | None:
+        row = self.armor_rows.get(int(hash_value))
+        if row is None:
+            return None
+
+        return self.armor_frame.row(row, named=True)
+
+    def write_projection(self, directory: str) -> None:
+        # Written uncompressed so the files can be memory-mapped on load. The
+        # version goes last, so an interrupted write is never picked up.
+        version_path = os.path.join(directory, PROJECTION_VERSION_FILE)
+        if os.path.isfile(version_path):
+            os.remove(version_path)
+
+        self.armor_frame.write_ipc(
+            os.path.join(directory, ARMOR_DEFINITIONS_FILE), compression="uncompressed"
+        )
+        self.plug_frame.write_ipc(
+            os.path.join(directory, INTRINSIC_PLUGS_FILE), compression="uncompressed"
+        )
+
+        with open(version_path, "w") as file:
+            json.dump(PROJECTION_VERSION, file)
+
+
+def has_projection(directory: str, newer_than: str) -> bool:
+    paths = [
+        os.path.join(directory, ARMOR_DEFINITIONS_FILE),
+        os.path.join(directory, INTRINSIC_PLUGS_FILE),
+    ]
+    if not all(os.path.isfile(path) for path in paths):
+        return False
+
+    try:
+        with open(os.path.join(directory, PROJECTION_VERSION_FILE), "r") as file:
+            if json.load(file) != PROJECTION_VERSION:
+                return False
+    except (OSError, ValueError):
+        return False
+
+    reference_mtime = os.path.getmtime(newer_than)
+    return all(os.path.getmtime(path) >= reference_mtime for path in paths)
+
+
+def base_stats_from_sockets(
+    sockets: pl.DataFrame, plug_frame: pl.DataFrame
+) -> pl.DataFrame:
+    # Sums the intrinsic plugs of every instance in one join, instead of looking
+    # up each plug on its own. Instances without intrinsic plugs are left out.
+    return (
+        sockets.lazy()
+        .filter(pl.col("IsEnabled"))
+        .join(plug_frame.lazy(), on="PlugHash", how="inner")
+        .group_by("Id")
+        .agg(pl.col(ARMOR_STATS).sum())
+        .with_columns(pl.sum_horizontal(ARMOR_STATS).alias("Total"))
+        .cast({stat: STAT_DTYPE for stat in [*ARMOR_STATS, "Total"]})
+        .collect()
+    )
+
+
+def unsigned_hash(id_val: int) -> int:
+    return id_val & 0xFFFFFFFF
+
+
+def has_artifice_socket(json_data: dict) -> bool:
+    socket_categories = json_data.get("sockets", {}).get("socketCategories", {})
+
+    perk_indices = []
+
+    for socket in socket_categories:
+        if socket.get("socketCategoryHash", 0) != ARMOR_PERKS_SOCKET_CATEGORY:
+            continue
+
+        perk_indices = socket["socketIndexes"]
+
+    socket_entries = json_data.get("sockets", {}).get("socketEntries", {})
+    for perk_index in perk_indices:
+        if socket_entries[perk_index]["singleInitialItemHash"] == ARTIFICE_PERK_PLUG:
+            # value refers to artifice armor mod. MIGHT CHANGE
+            return True
+    return False
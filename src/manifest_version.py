@@ -0,0 +1,53 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+
+import requests
+
+
+@dataclass
+class ManifestVersion:
+    version: str = ""
+    content_path: str = ""
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @classmethod
+    def load(cls, path: str) -> "ManifestVersion | None":
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            with open(path, "r") as file:
+                return cls(**json.load(file))
+        except (OSError, TypeError, ValueError):
+            return None
+
+    @classmethod
+    def from_response(cls, res: requests.Response) -> "ManifestVersion":
+        manifest = res.json()["Response"]
+
+        return cls(
+            version=manifest["version"],
+            content_path=manifest["mobileWorldContentPaths"]["en"],
+            etag=res.headers.get("ETag"),
+            last_modified=res.headers.get("Last-Modified"),
+        )
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(asdict(self), file)
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+    def same_content(self, other: "ManifestVersion") -> bool:
+        return self.version == other.version and self.content_path == other.content_path
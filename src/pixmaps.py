@@ -0,0 +1,96 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPainter, QPixmap, QPixmapCache
+
+
+PIXMAP_CACHE_LIMIT_KB = 64 * 1024
+
+
+def configure_pixmap_cache(limit_kb: int = PIXMAP_CACHE_LIMIT_KB) -> None:
+    QPixmapCache.setCacheLimit(limit_kb)
+
+
+def pixmap_cache_key(
+    base_path: str,
+    overlay_path: str | None,
+    size: int,
+    device_pixel_ratio: float = 1.0,
+) -> str:
+    # Icons are content-addressed on disk, so the base path identifies the item
+    # icon. Every copy of an item in the grid shares one decoded pixmap.
+    return f"icon:{base_path}|{overlay_path}|{size}|{device_pixel_ratio}"
+
+
+def composite_image(
+    base_path: str,
+    overlay_path: str | None,
+    size: int,
+    device_pixel_ratio: float = 1.0,
+) -> QImage:
+    # Only touches QImage, so it is safe to run in worker threads. Turning the
+    # result into a QPixmap must happen on the GUI thread.
+    pixel_size = round(size * device_pixel_ratio)
+
+    base = QImage(base_path)
+    if base.isNull():
+        return base
+
+    base = base.scaled(
+        pixel_size,
+        pixel_size,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation,
+    )
+
+    combined = QImage(base.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    combined.fill(Qt.GlobalColor.transparent)
+
+    painter = QPainter(combined)
+    painter.drawImage(0, 0, base)
+
+    if overlay_path:
+        overlay = QImage(overlay_path)
+        if not overlay.isNull():
+            painter.drawImage(
+                0,
+                0,
+                overlay.scaled(
+                    pixel_size,
+                    pixel_size,
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                ),
+            )
+
+    painter.end()
+    combined.setDevicePixelRatio(device_pixel_ratio)
+
+    return combined
+
+
+def pixmap_from_image(key: str, image: QImage) -> QPixmap:
+    cached = QPixmapCache.find(key)
+    if cached is not None:
+        return cached
+
+    pixmap = QPixmap.fromImage(image)
+    if not pixmap.isNull():
+        QPixmapCache.insert(key, pixmap)
+
+    return pixmap
+
+
+def composite_pixmap(
+    base_path: str,
+    overlay_path: str | None,
+    size: int,
+    device_pixel_ratio: float = 1.0,
+) -> QPixmap:
+    key = pixmap_cache_key(base_path, overlay_path, size, device_pixel_ratio)
+
+    cached = QPixmapCache.find(key)
+    if cached is not None:
+        return cached
+
+    return pixmap_from_image(
+        key, composite_image(base_path, overlay_path, size, device_pixel_ratio)
+    )
@@ -0,0 +1,130 @@
+import hashlib
+from collections.abc import Container
+from dataclasses import dataclass, field
+
+import polars as pl
+
+from src.armor_schema import ARMOR_SCHEMA, SOCKET_SCHEMA
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    import json
+
+    loads = json.loads
+
+
+Location = pl.Enum(["Vault", "Character", "Equipped"])
+
+PROFILE_ITEMS_SCHEMA = pl.Schema(
+    {
+        "Id": ARMOR_SCHEMA["Id"],
+        "Hash": ARMOR_SCHEMA["Hash"],
+        "Power": ARMOR_SCHEMA["Power"],
+        "Energy Capacity": ARMOR_SCHEMA["Energy Capacity"],
+        "Location": Location,
+    }
+)
+
+
+class ProfileError(Exception):
+    pass
+
+
+@dataclass
+class ProfileData:
+    fingerprint: str | None = None
+    items: pl.DataFrame = field(
+        default_factory=lambda: pl.DataFrame(schema=PROFILE_ITEMS_SCHEMA)
+    )
+    sockets: pl.DataFrame = field(
+        default_factory=lambda: pl.DataFrame(schema=SOCKET_SCHEMA)
+    )
+
+
+def parse_profile(
+    raw: bytes, armor_hashes: Container[int], known_fingerprint: str | None = None
+) -> ProfileData:
+    # Decodes the profile straight into column buffers for the armor pieces and
+    # their sockets. Nothing else in the response outlives this call. A profile
+    # matching `known_fingerprint` comes back with its fingerprint only.
+    payload = loads(raw)
+    response = payload.get("Response")
+    if not response:
+        # Errors and throttling come back without a Response.
+        raise ProfileError(
+            payload.get("Message")
+            or payload.get("ErrorStatus")
+            or "Bungie returned no profile"
+        )
+
+    fingerprint = profile_fingerprint(raw, response)
+    if fingerprint == known_fingerprint:
+        return ProfileData(fingerprint=fingerprint)
+
+    item_columns = {name: [] for name in PROFILE_ITEMS_SCHEMA.names()}
+    socket_columns = {name: [] for name in SOCKET_SCHEMA.names()}
+
+    item_components = response.get("itemComponents", {})
+    instances = item_components.get("instances", {}).get("data", {})
+    sockets = item_components.get("sockets", {}).get("data", {})
+
+    for location, items in iter_item_lists(response):
+        for item in items:
+            item_hash = item.get("itemHash")
+            instance_id = item.get("itemInstanceId")
+            if instance_id is None or item_hash not in armor_hashes:
+                continue
+
+            armor_id = int(instance_id)
+            instance = instances.get(instance_id, {})
+
+            item_columns["Id"].append(armor_id)
+            item_columns["Hash"].append(item_hash)
+            item_columns["Power"].append(
+                instance.get("primaryStat", {}).get("value", 0)
+            )
+            item_columns["Energy Capacity"].append(
+                instance.get("energy", {}).get("energyCapacity", 0)
+            )
+            item_columns["Location"].append(location)
+
+            for plug in sockets.get(instance_id, {}).get("sockets", []):
+                if "plugHash" not in plug:
+                    continue
+                socket_columns["Id"].append(armor_id)
+                socket_columns["PlugHash"].append(plug["plugHash"])
+                socket_columns["IsEnabled"].append(plug.get("isEnabled", False))
+
+    return ProfileData(
+        fingerprint=fingerprint,
+        items=pl.DataFrame(item_columns, schema=PROFILE_ITEMS_SCHEMA),
+        sockets=pl.DataFrame(socket_columns, schema=SOCKET_SCHEMA),
+    )
+
+
+def iter_item_lists(response: dict):
+    yield (
+        "Vault",
+        response.get("profileInventory", {}).get("data", {}).get("items", []),
+    )
+
+    for character in response.get("characterInventories", {}).get("data", {}).values():
+        yield "Character", character.get("items", [])
+
+    for character in response.get("characterEquipment", {}).get("data", {}).values():
+        yield "Equipped", character.get("items", [])
+
+
+def profile_fingerprint(raw: bytes, response: dict) -> str:
+    # Bungie re-mints these whenever the profile data behind them changes.
+    minted = (
+        response.get("responseMintedTimestamp"),
+        response.get("secondaryComponentsMintedTimestamp"),
+    )
+    if all(minted):
+        return "|".join(minted)
+
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
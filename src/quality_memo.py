@@ -0,0 +1,124 @@
+import os
+
+import polars as pl
+
+from src.armor_schema import (
+    ARMOR_SCHEMA,
+    MAX_DISC_TARGET,
+    MIN_DISC_TARGET,
+    STAT_DTYPE,
+)
+from src.manifest_index import ARMOR_STATS
+
+
+QUALITY_MEMO_PATH = os.path.join("data", "quality_memo.arrow")
+QUALITY_MEMO_MAX_ROWS = 20_000
+
+# A quality surface depends on the roll and the class flags but not on the
+# discipline target, so one row covers every slider position.
+QUALITY_KEY_SCHEMA = pl.Schema(
+    {"Id": ARMOR_SCHEMA["Id"]}
+    | {stat: STAT_DTYPE for stat in ARMOR_STATS}
+    | {
+        "IsArtifice": pl.Boolean,
+        "MobRes": pl.Boolean,
+        "ResRec": pl.Boolean,
+        "MobRec": pl.Boolean,
+    }
+)
+
+QUALITY_SURFACE_DTYPE = pl.Array(pl.Float64, MAX_DISC_TARGET - MIN_DISC_TARGET + 1)
+
+QUALITY_MEMO_SCHEMA = pl.Schema(
+    QUALITY_KEY_SCHEMA
+    | {"Quality Surface": QUALITY_SURFACE_DTYPE, "Last Used": pl.UInt32}
+)
+
+
+class QualityMemo:
+    def __init__(
+        self,
+        path: str = QUALITY_MEMO_PATH,
+        max_rows: int = QUALITY_MEMO_MAX_ROWS,
+    ) -> None:
+        self.path = path
+        self.max_rows = max_rows
+
+        # One row per (instance, roll, class flags) that has been scored.
+        # "Last Used" is the update count at which the row was last looked up, and
+        # the oldest rows are evicted first.
+        self.frame = pl.DataFrame(schema=QUALITY_MEMO_SCHEMA)
+        self.tick = 0
+        self.dirty = False
+
+    @classmethod
+    def load(
+        cls,
+        path: str = QUALITY_MEMO_PATH,
+        max_rows: int = QUALITY_MEMO_MAX_ROWS,
+    ) -> "QualityMemo":
+        memo = cls(path=path, max_rows=max_rows)
+
+        try:
+            frame = pl.read_ipc(path, memory_map=False)
+        except (OSError, pl.exceptions.PolarsError):
+            return memo
+
+        if frame.schema == QUALITY_MEMO_SCHEMA:
+            memo.frame = frame
+            memo.tick = frame["Last Used"].max() or 0
+
+        return memo
+
+    def lookup(self, keyed: pl.LazyFrame) -> pl.LazyFrame:
+        return keyed.join(
+            self.frame.lazy().drop("Last Used"),
+            on=QUALITY_KEY_SCHEMA.names(),
+            how="left",
+        )
+
+    def update(self, used: pl.DataFrame, scored: pl.DataFrame) -> None:
+        # `used` holds the keys of every row in this surface, `scored` the
+        # surfaces computed for the keys that were missing.
+        self.tick += 1
+        keys = QUALITY_KEY_SCHEMA.names()
+
+        inserted = scored.unique(keys).with_columns(
+            pl.lit(self.tick, dtype=pl.UInt32).alias("Last Used")
+        )
+        frame = pl.concat([self.frame, inserted])
+        frame = (
+            frame.join(
+                used.unique().with_columns(pl.lit(True).alias("Used")),
+                on=keys,
+                how="left",
+            )
+            .with_columns(
+                pl.when(pl.col("Used"))
+                .then(pl.lit(self.tick, dtype=pl.UInt32))
+                .otherwise(pl.col("Last Used"))
+                .alias("Last Used")
+            )
+            .drop("Used")
+        )
+
+        # Rows used by this run are never evicted, even past the limit.
+        if frame.height > self.max_rows:
+            frame = frame.sort("Last Used", descending=True, maintain_order=True).head(
+                max(self.max_rows, used.height)
+            )
+
+        # Recency alone is not worth rewriting the file for. It is saved along
+        # with the next new scores.
+        self.frame = frame
+        self.dirty = self.dirty or not inserted.is_empty()
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        self.frame.write_ipc(temp_path)
+        os.replace(temp_path, self.path)
+        self.dirty = False
@@ -0,0 +1,65 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import polars as pl
+
+from src.armor_cleaner import FilterParams
+from src.armor_schema import ARMOR_SCHEMA
+
+
+SNAPSHOT_DIR = os.path.join("data", "snapshot")
+ARMOR_FILE = "armor.arrow"
+TRASH_FILE = "trash.arrow"
+PARAMS_FILE = "params.json"
+
+TRASH_SCHEMA = pl.Schema({name: ARMOR_SCHEMA[name] for name in ["Id", "Hash"]})
+
+
+@dataclass
+class InventorySnapshot:
+    df: pl.DataFrame
+    trash_df: pl.DataFrame
+    # The settings trash_df was selected with. None for snapshots saved before
+    # they were recorded.
+    params: Optional[FilterParams] = None
+
+    @classmethod
+    def load(cls, directory: str = SNAPSHOT_DIR) -> "InventorySnapshot | None":
+        try:
+            df = pl.read_ipc(os.path.join(directory, ARMOR_FILE), memory_map=False)
+            trash_df = pl.read_ipc(
+                os.path.join(directory, TRASH_FILE), memory_map=False
+            )
+        except (OSError, pl.exceptions.PolarsError):
+            return None
+
+        # Snapshots written before a schema change are rebuilt by the next live
+        # refresh instead of being migrated.
+        if df.schema != ARMOR_SCHEMA or trash_df.schema != TRASH_SCHEMA:
+            return None
+
+        try:
+            with open(os.path.join(directory, PARAMS_FILE), "r") as file:
+                params = FilterParams(**json.load(file))
+        except (OSError, TypeError, ValueError):
+            params = None
+
+        return cls(df=df, trash_df=trash_df, params=params)
+
+    def save(self, directory: str = SNAPSHOT_DIR) -> None:
+        os.makedirs(directory, exist_ok=True)
+
+        for file_name, df in [(ARMOR_FILE, self.df), (TRASH_FILE, self.trash_df)]:
+            path = os.path.join(directory, file_name)
+            temp_path = f"{path}.tmp"
+            df.write_ipc(temp_path, compression="lz4")
+            os.replace(temp_path, path)
+
+        if self.params is not None:
+            path = os.path.join(directory, PARAMS_FILE)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(asdict(self.params), file)
+            os.replace(temp_path, path)
@@ -1,10 +1,12 @@
 import os
 from configparser import ConfigParser
+from dataclasses import dataclass
 
-from PyQt5.QtCore import QSize, Qt, pyqtSignal
-from PyQt5.QtGui import QClipboard, QFontMetrics, QIcon, QPainter, QPixmap
+from PyQt5.QtCore import QAbstractListModel, QRect, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QClipboard, QColor, QFontMetrics, QIcon, QPen, QPixmap
 from PyQt5.QtSvg import QSvgWidget
 from PyQt5.QtWidgets import (
+    QAbstractItemView,
     QAction,
     QApplication,
     QCheckBox,
@@ -13,114 +15,121 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QListView,
     QMainWindow,
     QMenu,
     QMessageBox,
     QPushButton,
-    QScrollArea,
     QSizePolicy,
     QSlider,
+    QStyle,
+    QStyledItemDelegate,
     QTextEdit,
     QVBoxLayout,
     QWidget,
 )
 
+from src.armor_cleaner import MAX_DISC_TARGET, MIN_DISC_TARGET
+from src.pixmaps import configure_pixmap_cache
 
-class HoverImage(QLabel):
-    def __init__(
-        self,
-        base_pixmap_path,
-        overlay_pixmap_path=None,
-        image_size=96,
-        tooltip_title="",
-        tooltip_body="",
-        tooltip_stats="",
-        armor_id: str = None,
-        parent=None,
-    ):
-        super().__init__(parent)
-        self.base_pixmap_path = base_pixmap_path
-        self.armor_id = armor_id
 
-        self.tooltip_title = tooltip_title
-        self.tooltip_body = tooltip_body
-        self.tooltip_stats = tooltip_stats
+@dataclass(slots=True)
+class ArmorGridItem:
+    armor_id: int
+    hash_value: int
+    pixmap: QPixmap
+    tooltip_title: str = "Loading..."
+    tooltip_body: str = "Fetching item details..."
+    tooltip_stats: str = ""
 
-        self.image_size = image_size
-        self.base_pixmap = QPixmap(base_pixmap_path).scaled(
-            image_size, image_size, Qt.AspectRatioMode.KeepAspectRatio
-        )
-        self.overlay_pixmap = (
-            QPixmap(overlay_pixmap_path).scaled(
-                image_size, image_size, Qt.AspectRatioMode.KeepAspectRatio
-            )
-            if overlay_pixmap_path
-            else None
+    def tooltip(self) -> str:
+        return (
+            f"<b>{self.tooltip_title}</b><br>{self.tooltip_body}<br>"
+            f"{self.tooltip_stats}"
         )
 
-        self.setMouseTracking(True)
-        self.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.setToolTip(f"""
-                        <b>{tooltip_title}</b><br>{tooltip_body}<br>{tooltip_stats}
-                        """)
-        self.setStyleSheet("border: 1px solid transparent;")
-
-        self.create_combined_pixmap()
-
-    def create_combined_pixmap(self):
-        if self.base_pixmap.isNull():
-            print("Error: base pixmap failed to load")
-            print(f"Pixmap Path: {self.base_pixmap_path}")
-            return
 
-        combined = QPixmap(self.base_pixmap.size())
-        combined.fill(Qt.GlobalColor.transparent)
+class ArmorGridModel(QAbstractListModel):
+    ArmorIdRole = Qt.ItemDataRole.UserRole + 1
 
-        painter = QPainter(combined)
-        painter.drawPixmap(0, 0, self.base_pixmap)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items: list[ArmorGridItem] = []
 
-        if self.overlay_pixmap:
-            painter.drawPixmap(0, 0, self.overlay_pixmap)
+    def rowCount(self, parent=None):
+        if parent is not None and parent.isValid():
+            return 0
 
-        painter.end()
-        self.setPixmap(combined)
+        return len(self.items)
 
-    def enterEvent(self, a0):
-        self.setStyleSheet("border: 1px solid #f7246c;")
-        self.setToolTip(f"""
-                        <b>{self.tooltip_title}</b><br>{self.tooltip_body}<br>{self.tooltip_stats}
-                        """)
-        super().enterEvent(a0)
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
 
-    def leaveEvent(self, a0):
-        self.setStyleSheet("border: 1px solid transparent;")
-        super().leaveEvent(a0)
+        item = self.items[index.row()]
 
-    def resizeEvent(self, a0):
-        size = self.image_size
-        self.setFixedSize(size, size)
-        super().resizeEvent(a0)
+        if role == Qt.ItemDataRole.DecorationRole:
+            return item.pixmap
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return item.tooltip()
+        if role == self.ArmorIdRole:
+            return item.armor_id
 
-    def contextMenuEvent(self, ev):
-        context_menu = QMenu(self)
+        return None
 
-        copy_action = QAction("Copy DIM ID", self)
-        tag_action = QAction("Tag as Ignore", self)
+    def set_items(self, items: list[ArmorGridItem]):
+        self.beginResetModel()
+        self.items = items
+        self.endResetModel()
 
-        context_menu.addAction(copy_action)
-        context_menu.addAction(tag_action)
-
-        copy_action.triggered.connect(
-            lambda: QApplication.clipboard().setText("id:" + self.armor_id)
+    def set_item_details(
+        self,
+        row: int,
+        pixmap: QPixmap,
+        tooltip_title: str,
+        tooltip_body: str,
+        tooltip_stats: str,
+    ):
+        item = self.items[row]
+        if not pixmap.isNull():
+            item.pixmap = pixmap
+        item.tooltip_title = tooltip_title
+        item.tooltip_body = tooltip_body
+        item.tooltip_stats = tooltip_stats
+
+        index = self.index(row)
+        self.dataChanged.emit(
+            index,
+            index,
+            [Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.ToolTipRole],
         )
-        tag_action.triggered.connect(
-            lambda: QMessageBox.warning(
-                self, "No Functionality", "This has not been implemented yet."
+
+
+class ArmorItemDelegate(QStyledItemDelegate):
+    def __init__(self, image_size=96, parent=None):
+        super().__init__(parent)
+        self.image_size = image_size
+        self.hover_pen = QPen(QColor("#f7246c"), 1)
+
+    def paint(self, painter, option, index):
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+
+        if pixmap is not None and not pixmap.isNull():
+            ratio = pixmap.devicePixelRatio()
+            target = QRect(
+                0, 0, round(pixmap.width() / ratio), round(pixmap.height() / ratio)
             )
-        )
+            target.moveCenter(option.rect.center())
+            painter.drawPixmap(target, pixmap)
+
+        if option.state & QStyle.StateFlag.State_MouseOver:
+            painter.save()
+            painter.setPen(self.hover_pen)
+            painter.drawRect(option.rect.adjusted(0, 0, -1, -1))
+            painter.restore()
 
-        context_menu.exec_(ev.globalPos())
-        super().contextMenuEvent(ev)
+    def sizeHint(self, option, index):
+        return QSize(self.image_size, self.image_size)
 
 
 class QualityInputSection(QGroupBox):
@@ -218,7 +227,7 @@ class DisciplineInputSection(QGroupBox):
 
         self.disc_stat_label = QLabel(f"Discipline Target: {default_disc_target}")
         self.disc_stat_slider = QSlider(Qt.Orientation.Horizontal)
-        self.disc_stat_slider.setRange(2, 30)
+        self.disc_stat_slider.setRange(MIN_DISC_TARGET, MAX_DISC_TARGET)
         self.disc_stat_slider.setTickPosition(QSlider.TickPosition.TicksBelow)
         self.disc_stat_slider.setValue(default_disc_target)
         self.disc_stat_slider.valueChanged.connect(self._on_value_changed)
@@ -247,60 +256,65 @@ class DisciplineInputSection(QGroupBox):
             pass
 
 
-class ImageGrid(QScrollArea):
+class ImageGrid(QListView):
+    # Only the cells in the viewport are painted, so the cost of a redraw does
+    # not grow with the number of items to delete.
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWidgetResizable(True)
 
         self.image_size = QSize(96, 96)
         self.margin = 4
-        self.image_labels = []
 
-        self.container = QWidget()
-        self.grid_layout = QGridLayout()
-        self.grid_layout.setSpacing(self.margin)
-        self.grid_layout.setContentsMargins(
-            self.margin, self.margin, self.margin, self.margin
-        )
-        self.container.setLayout(self.grid_layout)
+        self.grid_model = ArmorGridModel(self)
+        self.setModel(self.grid_model)
+        self.setItemDelegate(ArmorItemDelegate(self.image_size.width(), self))
 
-        self.setWidget(self.container)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setMovement(QListView.Movement.Static)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(True)
+        self.setSpacing(self.margin)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        self.setMouseTracking(True)
+        self.viewport().setAttribute(Qt.WidgetAttribute.WA_Hover)
+        self.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
 
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
 
-    def add_image(self, image: HoverImage):
-        num_cols = self.get_num_cols()
-
-        idx = self.grid_layout.count()
-        row = idx // num_cols
-        col = idx % num_cols
+    def set_items(self, items: list[ArmorGridItem]):
+        self.grid_model.set_items(items)
 
-        self.grid_layout.addWidget(image, row, col)
+    def clear_grid(self):
+        self.grid_model.set_items([])
 
-    def add_image_at_coords(self, image, row, col):
-        self.grid_layout.addWidget(image, row, col)
+    def contextMenuEvent(self, e):
+        index = self.indexAt(e.pos())
+        if not index.isValid():
+            return
 
-        self.grid_layout.setRowStretch(self.grid_layout.rowCount(), 1)
-        self.grid_layout.setColumnStretch(self.grid_layout.columnCount(), 1)
+        armor_id = index.data(ArmorGridModel.ArmorIdRole)
 
-    def get_num_cols(self):
-        cell_width = self.image_size.width() + self.margin
-        viewport_width = self.viewport().width() - self.margin
+        context_menu = QMenu(self)
 
-        if cell_width == 0:
-            num_cols = 1
-        else:
-            num_cols = max(1, viewport_width // cell_width)
+        copy_action = QAction("Copy DIM ID", self)
+        tag_action = QAction("Tag as Ignore", self)
 
-        return num_cols
+        context_menu.addAction(copy_action)
+        context_menu.addAction(tag_action)
 
-    def clear_grid(self):
-        for i in reversed(range(self.grid_layout.count())):
-            self.grid_layout.itemAt(i).widget().setParent(None)
+        copy_action.triggered.connect(
+            lambda: QApplication.clipboard().setText(f"id:{armor_id}")
+        )
+        tag_action.triggered.connect(
+            lambda: QMessageBox.warning(
+                self, "No Functionality", "This has not been implemented yet."
+            )
+        )
 
-    def replaceWidget(self, label, newlabel):
-        self.grid_layout.replaceWidget(label, newlabel)
+        context_menu.exec_(e.globalPos())
 
 
 class CheckboxGrid(QGroupBox):
@@ -393,6 +407,8 @@ class AppUI(QMainWindow):
 
         self.configur = config_parser
 
+        configure_pixmap_cache()
+
         self.setWindowTitle("Walker's Destiny Armor Tool")
         icon_path = os.path.join("src", "assets", "icon.png")
         self.setWindowIcon(QIcon(icon_path))
@@ -553,16 +569,6 @@ class AppUI(QMainWindow):
     def show_warning(self, title: str = "", body: str = ""):
         QMessageBox.warning(self, title, body)
 
-    def add_to_photo_grid(self, image_path: str, overlay_path: str, item_data: dict):
-        label = HoverImage(
-            base_pixmap_path=image_path,
-            overlay_pixmap_path=overlay_path,
-            image_size=96,
-            tooltip_title=item_data["name"],
-            tooltip_body=item_data["flavorText"],
-        )
-        self.image_grid.add_image(label)
-
     def set_process_enabled_state(self, enabled: bool):
         self.run_button.setEnabled(enabled)
 
@@ -574,8 +580,20 @@ class AppUI(QMainWindow):
     def clear_photo_grid(self):
         self.image_grid.clear_grid()
 
-    def add_to_grid_at_coords(self, image, row, col):
-        self.image_grid.add_image_at_coords(image, row, col)
+    def set_grid_items(self, items: list[ArmorGridItem]):
+        self.image_grid.set_items(items)
+
+    def update_grid_item(
+        self,
+        row: int,
+        pixmap: QPixmap,
+        tooltip_title: str,
+        tooltip_body: str,
+        tooltip_stats: str,
+    ):
+        self.image_grid.grid_model.set_item_details(
+            row, pixmap, tooltip_title, tooltip_body, tooltip_stats
+        )
 
     def write_to_status_bar(self, text: str) -> None:
         self.output_box.setText(text)
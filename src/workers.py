@@ -1,25 +1,119 @@
-import os
-
+import requests
 from PyQt5.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage
+
+from src.icon_store import IconStore
+from src.pixmaps import composite_image, pixmap_cache_key
 
 
 class IconLoaderSignals(QObject):
     item_loaded = pyqtSignal(str, str, dict)
-    finished = pyqtSignal(str)
+    finished = pyqtSignal(int, str, str, QImage)
 
 
 class IconLoaderRunnable(QRunnable):
-    def __init__(self, hash_value, api):
+    def __init__(
+        self,
+        hash_value,
+        api,
+        icon_store: IconStore,
+        image_size: int = 96,
+        device_pixel_ratio: float = 1.0,
+        generation: int = 0,
+        is_current=lambda generation: True,
+    ):
         super().__init__()
+        self.generation = generation
+        self.is_current = is_current
         self.hash_value = hash_value
         self.api = api
+        self.icon_store = icon_store
+        self.image_size = image_size
+        self.device_pixel_ratio = device_pixel_ratio
         self.signals = IconLoaderSignals()
 
     @pyqtSlot()
     def run(self):
-        base_path = f"data/icons/{self.hash_value}.png"
+        # The results were replaced since this task was queued.
+        if not self.is_current(self.generation):
+            return
+
+        try:
+            cache_key, image = self.load_icon()
+        except Exception as e:
+            # An exception must not escape run(), and the run still has to be
+            # told this icon is done.
+            print(f"Icon load failed for {self.hash_value}: {e}")
+            cache_key, image = "", QImage()
+
+        self.signals.finished.emit(
+            self.generation, str(self.hash_value), cache_key, image
+        )
+
+    def load_icon(self) -> tuple[str, QImage]:
+        icon_path, watermark_path = self.api.get_item_icon_paths(self.hash_value)
+
+        try:
+            self.icon_store.ensure(icon_path)
+            self.icon_store.ensure(watermark_path)
+        except requests.RequestException as e:
+            # Composites whatever is already on disk.
+            print(f"Icon download failed for {self.hash_value}: {e}")
+
+        base_path = self.icon_store.path_for(icon_path)
+        overlay_path = self.icon_store.path_for(watermark_path)
+
+        # Decoding, scaling and compositing happen here so the GUI thread only
+        # has to turn the finished image into a pixmap.
+        cache_key = pixmap_cache_key(
+            base_path, overlay_path, self.image_size, self.device_pixel_ratio
+        )
+        image = (
+            composite_image(
+                base_path, overlay_path, self.image_size, self.device_pixel_ratio
+            )
+            if base_path
+            else QImage()
+        )
+
+        return cache_key, image
+
 
-        if not os.path.isfile(base_path):
-            self.api.get_item_icon_from_hash(self.hash_value, base_path)
+class RefreshCancelled(Exception):
+    pass
+
+
+class RefreshSignals(QObject):
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class RefreshRunnable(QRunnable):
+    def __init__(self, generation: int, work, is_current):
+        super().__init__()
+        self.generation = generation
+        self.work = work
+        self.is_current = is_current
+        self.signals = RefreshSignals()
+
+    def report_progress(self, stage: str) -> None:
+        # Doubles as the cancellation point between stages, so a superseded
+        # refresh stops before doing any more work.
+        if not self.is_current(self.generation):
+            raise RefreshCancelled()
+
+        self.signals.progress.emit(self.generation, stage)
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.work(self.report_progress)
+        except RefreshCancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
 
-        self.signals.finished.emit(str(self.hash_value))
+        if self.is_current(self.generation):
+            self.signals.finished.emit(self.generation, result)
@@ -0,0 +1,59 @@
+import polars as pl
+import pytest
+
+from src.armor_cleaner import FilterParams
+from src.armor_schema import ARMOR_SCHEMA
+
+
+@pytest.fixture
+def filter_params():
+    return FilterParams(
+        target_discipline=20,
+        max_quality=1.1,
+        ignore_common_armor=True,
+        always_keep_highest_power=False,
+        build_flags={
+            "Hunter": {"MobRes": True, "ResRec": True, "MobRec": False},
+            "Warlock": {"MobRes": False, "ResRec": True, "MobRec": False},
+            "Titan": {"MobRes": False, "ResRec": True, "MobRec": False},
+        },
+    )
+
+
+def make_armor(
+    armor_id: int,
+    stats: tuple[int, int, int, int, int, int],
+    item_hash: int = 1,
+    tier: str = "Legendary",
+    item_sub_type: str = "HelmetArmor",
+    source: str | None = None,
+    equippable: str = "Hunter",
+    is_artifice: bool = False,
+    power: int = 2000,
+    energy: int = 10,
+) -> dict:
+    mob, res, rec, dis, int_, str_ = stats
+    return {
+        "Name": f"Armor {armor_id}",
+        "Hash": item_hash,
+        "Id": armor_id,
+        "Tier": tier,
+        "ItemSubType": item_sub_type,
+        "Source": source,
+        "Equippable": equippable,
+        "Power": power,
+        "Energy Capacity": energy,
+        "IsMasterworked": energy == 10,
+        "IsArtifice": is_artifice,
+        "Mobility": mob,
+        "Resilience": res,
+        "Recovery": rec,
+        "Discipline": dis,
+        "Intellect": int_,
+        "Strength": str_,
+        "Total": sum(stats),
+    }
+
+
+def make_armor_df(rows: list[dict]) -> pl.DataFrame:
+    return pl.DataFrame(rows, schema=ARMOR_SCHEMA)
@@ -1,9 +1,11 @@
 import os
+from dataclasses import replace
 
 import polars as pl
 import pytest
 
 from src.armor_cleaner import ArmorFilter
+from tests.conftest import make_armor, make_armor_df
 
 
 pl.Config.set_tbl_rows(100000)
@@ -26,3 +28,221 @@ def test_class_item_selection(load_csv):
     filtered = armor_filter.filter_class_items(df=df)
 
     print(filtered)
+
+
+def test_filter_plan_is_lazy(filter_params):
+    df = make_armor_df([make_armor(1, (2, 30, 2, 30, 2, 2))])
+    armor_filter = ArmorFilter()
+
+    plan = armor_filter.build_filter_plan(df.lazy(), filter_params)
+
+    assert isinstance(plan, pl.LazyFrame)
+    assert plan.collect_schema().names() == ["Id", "Hash"]
+
+
+def test_filter_keeps_best_legendary_per_slot(filter_params):
+    df = make_armor_df(
+        [
+            make_armor(1, (2, 30, 2, 30, 2, 2)),
+            make_armor(2, (10, 10, 10, 10, 10, 10)),
+            make_armor(3, (10, 10, 10, 10, 10, 10), equippable="Titan"),
+        ]
+    )
+    armor_filter = ArmorFilter()
+
+    filtered = armor_filter.filter_armor_items(df, filter_params)
+
+    assert filtered["Id"].to_list() == [2]
+
+
+def test_artifice_boost_reports_best_stat(filter_params):
+    df = make_armor_df(
+        [
+            make_armor(1, (2, 30, 2, 18, 2, 2), is_artifice=True),
+            make_armor(2, (2, 30, 2, 30, 2, 2), is_artifice=True),
+        ]
+    )
+    armor_filter = ArmorFilter()
+
+    scored = armor_filter.min_quality_with_artifice_boost(
+        df=df,
+        target_disc=filter_params.target_discipline,
+        build_flags=filter_params.build_flags,
+    ).sort("Id")
+
+    assert scored["Artifice Stat"].to_list() == ["Discipline", None]
+    assert scored["Quality"].to_list() == pytest.approx([9 / 4, 0])
+
+
+def test_unknown_class_rows_are_kept_unscored(filter_params):
+    df = make_armor_df(
+        [
+            make_armor(1, (10, 10, 10, 10, 10, 10)),
+            make_armor(2, (10, 10, 10, 10, 10, 10), equippable="Unknown"),
+        ]
+    )
+    armor_filter = ArmorFilter()
+
+    scored = armor_filter.compute_quality(
+        df=df,
+        target_disc=filter_params.target_discipline,
+        build_flags=filter_params.build_flags,
+    )
+
+    assert scored["Id"].to_list() == [1, 2]
+    assert scored["Quality"].null_count() == 1
+
+
+def test_class_items_fall_back_when_no_preferred_source():
+    no_stats = (0, 0, 0, 0, 0, 0)
+    df = make_armor_df(
+        [
+            make_armor(1, no_stats, item_sub_type="ClassArmor", source="lastwish"),
+            make_armor(
+                2,
+                no_stats,
+                item_sub_type="ClassArmor",
+                source="lastwish",
+                energy=5,
+            ),
+            make_armor(3, no_stats, item_sub_type="ClassArmor"),
+            make_armor(4, no_stats, item_sub_type="ClassArmor", equippable="Titan"),
+            make_armor(
+                5,
+                no_stats,
+                item_sub_type="ClassArmor",
+                equippable="Titan",
+                power=1900,
+            ),
+        ]
+    )
+    armor_filter = ArmorFilter()
+
+    filtered = armor_filter.filter_class_items(df=df)
+
+    assert sorted(filtered["Id"].to_list()) == [2, 3, 5]
+
+
+def test_class_items_keep_highest_energy_per_source():
+    no_stats = (0, 0, 0, 0, 0, 0)
+    df = make_armor_df(
+        [
+            make_armor(
+                armor_id,
+                no_stats,
+                item_sub_type="ClassArmor",
+                source=source,
+                equippable=equippable,
+                energy=energy,
+                power=power,
+            )
+            for armor_id, (source, equippable, energy, power) in enumerate(
+                [
+                    ("lastwish", "Hunter", 9, 1990),
+                    ("lastwish", "Hunter", 10, 1900),
+                    ("lastwish", "Hunter", 10, 1950),
+                    ("kingsfall", "Hunter", 4, 2000),
+                    ("kingsfall", "Hunter", 8, 1800),
+                    ("lastwish", "Warlock", 2, 1800),
+                    ("lastwish", "Warlock", 7, 1800),
+                ],
+                start=1,
+            )
+        ]
+    )
+    armor_filter = ArmorFilter()
+
+    filtered = armor_filter.filter_class_items(df=df)
+
+    assert sorted(filtered["Id"].to_list()) == [1, 2, 4, 6]
+
+
+def test_quality_surface_matches_full_runs(filter_params):
+    df = make_armor_df(
+        [
+            make_armor(1, (2, 28, 2, 30, 2, 2)),
+            make_armor(2, (2, 30, 2, 6, 14, 12)),
+            make_armor(3, (2, 30, 2, 18, 2, 2), is_artifice=True),
+            make_armor(4, (2, 26, 6, 12, 2, 2), is_artifice=True),
+            make_armor(5, (2, 30, 2, 10, 10, 10), is_artifice=True),
+        ]
+    )
+    filter_params.max_quality = 0.4
+    armor_filter = ArmorFilter()
+
+    surface = armor_filter.build_quality_surface(df, filter_params)
+
+    deleted = {}
+    for target in [2, 10, 20, 30]:
+        params = replace(filter_params, target_discipline=target)
+        assert surface.matches(params)
+
+        qualities = surface.artifice_armor["Quality Surface"].arr.get(target - 2)
+        expected = armor_filter.min_quality_with_artifice_boost(
+            surface.artifice_armor, target, filter_params.build_flags
+        )
+        assert qualities.equals(expected["Quality"])
+
+        filtered = armor_filter.filter_quality_surface(
+            surface, target, params.max_quality
+        )
+        assert filtered.equals(armor_filter.filter_armor_items(df, params))
+        deleted[target] = sorted(filtered["Id"].to_list())
+
+    assert deleted[2] != deleted[30]
+    assert surface.matches(replace(filter_params, max_quality=2.0))
+    assert not surface.matches(replace(filter_params, ignore_common_armor=False))
+
+
+def test_targets_outside_the_surface_are_scored_in_full(filter_params):
+    df = make_armor_df(
+        [
+            make_armor(1, (2, 28, 2, 30, 2, 2)),
+            make_armor(2, (2, 30, 2, 6, 14, 12)),
+            make_armor(3, (2, 30, 2, 18, 2, 2), is_artifice=True),
+            make_armor(4, (2, 26, 6, 12, 2, 2), is_artifice=True),
+        ]
+    )
+    filter_params.max_quality = 0.4
+    armor_filter = ArmorFilter()
+    surface = armor_filter.build_quality_surface(df, filter_params)
+
+    for target in [1, 40]:
+        params = replace(filter_params, target_discipline=target)
+        filtered = armor_filter.filter_quality_surface(
+            surface, target, params.max_quality
+        )
+        assert filtered.equals(armor_filter.filter_armor_items(df, params))
+
+
+def test_quality_surface_is_reused_until_inputs_change(filter_params):
+    df = make_armor_df([make_armor(1, (2, 28, 2, 30, 2, 2))])
+    armor_filter = ArmorFilter()
+
+    surface = armor_filter.quality_surface(df, filter_params)
+    retargeted = replace(filter_params, target_discipline=30, max_quality=2.0)
+    assert armor_filter.quality_surface(df, retargeted) is surface
+
+    refreshed = df.clone()
+    rebuilt = armor_filter.quality_surface(refreshed, filter_params)
+    assert rebuilt is not surface
+
+    reflagged = replace(filter_params, ignore_common_armor=False)
+    assert armor_filter.quality_surface(refreshed, reflagged) is not rebuilt
+
+
+def test_unscored_rows_never_displace_keepers():
+    df = pl.DataFrame(
+        {
+            "Id": [1, 2, 3],
+            "Hash": [1, 1, 1],
+            "Equippable": ["Hunter"] * 3,
+            "ItemSubType": ["HelmetArmor"] * 3,
+            "Quality": [None, 0.5, 2.0],
+        }
+    )
+    armor_filter = ArmorFilter()
+
+    filtered = armor_filter.filter_normal_and_artifice(df=df, max_quality=0.1)
+
+    assert filtered["Id"].to_list() == [3]
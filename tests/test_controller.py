@@ -0,0 +1,198 @@
+import json
+from configparser import ConfigParser
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.armor_cleaner import ArmorFilter
+from src.controller import AppController, RefreshResult
+from src.profile_ingest import ProfileError
+from src.quality_memo import QUALITY_MEMO_PATH, QualityMemo
+from src.snapshot import InventorySnapshot
+from src.workers import IconLoaderRunnable, RefreshRunnable
+from tests.conftest import make_armor, make_armor_df
+
+
+def make_profile(minted: str) -> bytes:
+    return json.dumps(
+        {
+            "Response": {
+                "responseMintedTimestamp": minted,
+                "secondaryComponentsMintedTimestamp": minted,
+            }
+        }
+    ).encode()
+
+
+@pytest.fixture
+def controller(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configur = ConfigParser()
+    configur.read_dict(
+        {
+            "values": {
+                "DEFAULT_MAX_QUALITY": "1.1",
+                "DEFAULT_DISC_TARGET": "20",
+                "IGNORE_COMMONS": "True",
+            }
+        }
+    )
+    api = MagicMock()
+    api.icon_fetcher.pool_size = 1
+
+    controller = AppController(
+        ui=MagicMock(),
+        api=api,
+        armor_cleaner=ArmorFilter(),
+        auth=MagicMock(),
+        configur=configur,
+    )
+    controller.create_armor_df = lambda profile: make_armor_df(
+        [
+            make_armor(1, (2, 30, 2, 30, 2, 2)),
+            make_armor(2, (10, 10, 10, 10, 10, 10)),
+        ]
+    )
+    return controller
+
+
+def run_refresh(controller: AppController, raw: bytes):
+    controller.fetch_profile = lambda: raw
+    return controller.run_refresh(
+        True, controller.get_filter_params(), lambda stage: None
+    )
+
+
+def test_changed_profile_is_scored(controller):
+    result = run_refresh(controller, make_profile("1"))
+
+    assert result.fingerprint == "1|1"
+    assert result.df is not None
+    assert result.trash_df["Id"].to_list() == [2]
+
+
+def test_changed_profile_reuses_remembered_surfaces(controller):
+    controller.armor_cleaner = ArmorFilter(quality_memo=QualityMemo())
+    run_refresh(controller, make_profile("1"))
+    assert QualityMemo.load().frame["Id"].sort().to_list() == [1, 2]
+
+    create_armor_df = controller.create_armor_df
+    controller.create_armor_df = lambda profile: create_armor_df(profile).vstack(
+        make_armor_df([make_armor(3, (2, 30, 2, 30, 2, 2))])
+    )
+    scored = []
+    score = controller.armor_cleaner.with_quality_surface
+
+    def with_quality_surface(df, *args):
+        scored.extend(df["Id"])
+        return score(df, *args)
+
+    controller.armor_cleaner.with_quality_surface = with_quality_surface
+
+    result = run_refresh(controller, make_profile("2"))
+
+    assert scored == [3]
+    assert result.trash_df["Id"].to_list() == [2]
+    assert QualityMemo.load(QUALITY_MEMO_PATH).frame.height == 3
+
+
+def test_unchanged_profile_is_skipped(controller):
+    controller.last_profile_fingerprint = "1|1"
+    controller.last_filter_params = controller.get_filter_params()
+
+    result = run_refresh(controller, make_profile("1"))
+
+    assert result.df is None
+    assert result.trash_df is None
+
+
+def test_unchanged_profile_is_rescored_for_new_settings(controller):
+    controller.df = controller.create_armor_df(None)
+    controller.create_armor_df = None
+    controller.last_profile_fingerprint = "1|1"
+
+    result = run_refresh(controller, make_profile("1"))
+
+    assert result.df is None
+    assert result.trash_df["Id"].to_list() == [2]
+
+
+def test_profile_errors_are_not_mistaken_for_unchanged(controller):
+    controller.last_profile_fingerprint = "1|1"
+    controller.last_filter_params = controller.get_filter_params()
+
+    with pytest.raises(ProfileError, match="throttled"):
+        run_refresh(controller, b'{"ErrorCode": 51, "Message": "throttled"}')
+
+
+def test_superseded_refreshes_are_dropped(controller):
+    finished = []
+    current = [1]
+
+    def superseded_mid_run(report_progress):
+        current[0] = 2
+        report_progress("Scoring armor...")
+
+    def superseded_after_run(report_progress):
+        current[0] = 2
+
+    for work in [superseded_mid_run, superseded_after_run]:
+        current[0] = 1
+        task = RefreshRunnable(1, work, lambda generation: generation == current[0])
+        task.signals.finished.connect(lambda *args: finished.append(args))
+        task.run()
+
+    assert finished == []
+
+    controller.refresh_generation = 2
+    stale = RefreshResult(
+        params=controller.get_filter_params(), df=make_armor_df([]), fingerprint="1"
+    )
+    controller._on_refresh_finished(1, stale)
+    assert controller.last_profile_fingerprint is None
+
+
+def test_skipped_refresh_restores_the_last_result_message(controller):
+    controller.result_message = "Found 2 Armor Pieces to Delete."
+    controller.refresh_generation = 1
+
+    controller._on_refresh_finished(
+        1, RefreshResult(params=controller.get_filter_params())
+    )
+
+    controller.ui.write_to_status_bar.assert_called_with(
+        "Found 2 Armor Pieces to Delete."
+    )
+
+
+def test_failed_icon_loads_still_report_completion():
+    api = MagicMock()
+    api.get_item_icon_paths.side_effect = OSError("manifest is being replaced")
+    finished = []
+
+    task = IconLoaderRunnable(7, api, icon_store=MagicMock())
+    task.signals.finished.connect(lambda *args: finished.append(args))
+    task.run()
+
+    [(generation, hash_value, cache_key, image)] = finished
+    assert hash_value == "7"
+    assert image.isNull()
+
+
+def test_snapshot_from_other_settings_is_refiltered_on_load(controller):
+    df = controller.create_armor_df(None)
+    empty_trash = df.select("Id", "Hash").clear()
+    refiltered = []
+    controller.start_refresh = lambda fetch_profile: refiltered.append(fetch_profile)
+
+    params = controller.get_filter_params()
+    InventorySnapshot(df=df, trash_df=empty_trash, params=params).save()
+    assert controller.load_snapshot()
+    assert controller.last_filter_params == params
+    assert refiltered == []
+
+    params.target_discipline = 30
+    InventorySnapshot(df=df, trash_df=empty_trash, params=params).save()
+    assert controller.load_snapshot()
+    assert controller.last_filter_params == params
+    assert refiltered == [False]
@@ -0,0 +1,41 @@
+import threading
+import time
+
+import requests
+
+from src.icon_fetcher import IconFetcher
+
+
+def make_response(content: bytes) -> requests.Response:
+    res = requests.Response()
+    res.status_code = 200
+    res._content = content
+    return res
+
+
+def test_concurrent_fetches_of_one_url_share_a_request(tmp_path):
+    fetcher = IconFetcher()
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        time.sleep(0.1)
+        return make_response(b"png bytes")
+
+    fetcher.session.get = fake_get
+
+    paths = [tmp_path / f"{i}_overlay.png" for i in range(4)]
+    threads = [
+        threading.Thread(
+            target=fetcher.download, args=("https://example.com/wm.png", str(path))
+        )
+        for path in paths
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["https://example.com/wm.png"]
+    assert all(path.read_bytes() == b"png bytes" for path in paths)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(p.name for p in paths)
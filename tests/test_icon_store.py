@@ -0,0 +1,54 @@
+import os
+
+from src.icon_store import INDEX_FILE, IconStore
+
+
+class FakeFetcher:
+    def __init__(self, size: int = 10) -> None:
+        self.size = size
+        self.urls: list[str] = []
+
+    def download(self, url: str, path: str) -> None:
+        self.urls.append(url)
+        with open(path, "wb") as file:
+            file.write(b"x" * self.size)
+
+
+def test_icons_are_stored_once_per_manifest_path(tmp_path):
+    fetcher = FakeFetcher()
+    store = IconStore(fetcher, directory=str(tmp_path))
+
+    first = store.ensure("/common/watermark.png")
+    second = store.ensure("/common/watermark.png")
+
+    assert first == second == store.path_for("/common/watermark.png")
+    assert fetcher.urls == ["https://www.bungie.net/common/watermark.png"]
+    assert not os.path.exists(tmp_path / INDEX_FILE)
+
+    store.flush()
+    reopened = IconStore(FakeFetcher(), directory=str(tmp_path))
+    assert reopened.get("/common/watermark.png") == first
+
+
+def test_least_recently_used_icons_are_evicted(tmp_path):
+    store = IconStore(FakeFetcher(size=10), directory=str(tmp_path), max_bytes=25)
+
+    store.ensure("/a.png")
+    store.ensure("/b.png")
+    store.get("/a.png")
+    store.ensure("/c.png")
+    store.flush()
+
+    assert store.get("/b.png") is None
+    assert store.get("/a.png") is not None
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [INDEX_FILE, store.file_name("/a.png"), store.file_name("/c.png")]
+    )
+
+
+def test_untracked_files_are_pruned(tmp_path):
+    (tmp_path / "1234_overlay.png").write_bytes(b"old layout")
+
+    IconStore(FakeFetcher(), directory=str(tmp_path))
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,40 @@
+import polars as pl
+
+from src.armor_schema import ARMOR_SCHEMA, INSTANCE_ARMOR_SCHEMA
+from src.inventory import ArmorInventory
+from tests.conftest import make_armor
+
+
+def make_instances(rows: list[tuple[int, int, int]]) -> pl.DataFrame:
+    return pl.DataFrame(rows, schema=INSTANCE_ARMOR_SCHEMA, orient="row")
+
+
+def test_update_adds_removes_and_refreshes_instances():
+    stats = (10, 10, 10, 10, 10, 10)
+    inventory = ArmorInventory()
+
+    changes = inventory.update(
+        make_instances([(1, 2000, 10), (2, 2000, 10)]),
+        pl.DataFrame([make_armor(1, stats), make_armor(2, stats)], schema=ARMOR_SCHEMA),
+    )
+    assert changes.added == [1, 2]
+    assert not changes.removed
+
+    changes = inventory.update(
+        make_instances([(2, 2010, 9), (3, 2000, 10)]),
+        pl.DataFrame([make_armor(3, stats)], schema=ARMOR_SCHEMA),
+    )
+
+    assert changes.added == [3]
+    assert changes.removed == [1]
+    assert changes.updated == [2]
+    assert inventory.ids == {2, 3}
+    assert inventory.df.filter(pl.col("Id") == 2).select(
+        "Power", "Energy Capacity", "IsMasterworked"
+    ).row(0) == (2010, 9, False)
+
+    changes = inventory.update(
+        make_instances([(2, 2010, 9), (3, 2000, 10)]),
+        pl.DataFrame(schema=ARMOR_SCHEMA),
+    )
+    assert changes.is_empty()
@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+
+from src.manifest_db import ManifestDatabase
+
+
+def make_manifest(path) -> None:
+    con = sqlite3.connect(path)
+    con.execute(
+        "CREATE TABLE DestinyStatDefinition (id INTEGER PRIMARY KEY, json BLOB)"
+    )
+    con.execute("INSERT INTO DestinyStatDefinition VALUES (1, '{}')")
+    con.commit()
+    con.close()
+
+
+def test_connections_are_pooled_across_threads_and_reopen_after_close(tmp_path):
+    path = tmp_path / "manifest.content"
+    make_manifest(path)
+
+    db = ManifestDatabase(str(path))
+    with db.connection() as main_con:
+        pass
+
+    # Threads that have since exited hand their connection back to the pool.
+    other = []
+
+    def query():
+        with db.connection() as con:
+            other.append(con)
+
+    for _ in range(3):
+        thread = threading.Thread(target=query)
+        thread.start()
+        thread.join()
+
+    assert all(con is main_con for con in other)
+    assert db._open == 1
+
+    db.close()
+    rows = db.fetch_all("SELECT id FROM DestinyStatDefinition WHERE id=?;", (1,))
+    assert rows == [(1,)]
+    with db.connection() as con:
+        assert con is not main_con
+
+
+def test_pool_never_exceeds_its_cap(tmp_path):
+    path = tmp_path / "manifest.content"
+    make_manifest(path)
+    db = ManifestDatabase(str(path), max_connections=2)
+
+    ready = threading.Barrier(3)
+    release = threading.Event()
+    seen = set()
+
+    def hold():
+        with db.connection() as con:
+            seen.add(id(con))
+            ready.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+
+    waiter = threading.Thread(target=lambda: db.fetch_all("SELECT 1;"))
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert waiter.is_alive()
+
+    release.set()
+    for thread in [*threads, waiter]:
+        thread.join()
+
+    assert len(seen) == 2
+    assert db._open == 2
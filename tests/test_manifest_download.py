@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+from src.manifest_download import (
+    extract_single_member,
+    manifest_lock,
+    remove_orphaned_downloads,
+)
+
+
+def test_extract_replaces_target_without_leaving_temp_files(tmp_path):
+    zip_path = tmp_path / "manifest.zip"
+    with zipfile.ZipFile(zip_path, "w") as zipped:
+        zipped.writestr("world_sql_content_abc.content", b"new manifest")
+
+    target = tmp_path / "manifest.content"
+    target.write_bytes(b"old manifest")
+
+    extract_single_member(str(zip_path), str(target))
+
+    assert target.read_bytes() == b"new manifest"
+    assert sorted(os.listdir(tmp_path)) == ["manifest.content", "manifest.zip"]
+
+
+def test_lock_is_exclusive_and_released(tmp_path):
+    lock_path = str(tmp_path / "manifest.lock")
+
+    with manifest_lock(lock_path):
+        with pytest.raises(TimeoutError):
+            with manifest_lock(lock_path, timeout=0):
+                pass
+
+    assert not os.path.exists(lock_path)
+
+    with manifest_lock(lock_path, timeout=0):
+        assert os.path.exists(lock_path)
+
+
+def test_lock_of_live_process_is_kept_however_old(tmp_path):
+    lock_path = tmp_path / "manifest.lock"
+    lock_path.write_text(str(os.getppid()))
+    os.utime(lock_path, (0, 0))
+
+    with pytest.raises(TimeoutError):
+        with manifest_lock(str(lock_path), timeout=0):
+            pass
+
+    assert lock_path.read_text() == str(os.getppid())
+
+
+def test_unclaimed_lock_is_taken_over_after_grace(tmp_path):
+    lock_path = tmp_path / "manifest.lock"
+    lock_path.write_text("")
+    os.utime(lock_path, (0, 0))
+
+    with manifest_lock(str(lock_path), timeout=0):
+        assert lock_path.read_text() == str(os.getpid())
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_lock_of_exited_process_is_taken_over(tmp_path):
+    owner = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    lock_path = tmp_path / "manifest.lock"
+    lock_path.write_text(owner.stdout.strip())
+
+    with manifest_lock(str(lock_path), timeout=0):
+        assert lock_path.read_text() == str(os.getpid())
+
+
+def test_orphaned_downloads_are_removed(tmp_path):
+    for name in ["manifest.content", "tmpa1b2.zip", "tmpc3d4.content", "x.json"]:
+        (tmp_path / name).write_bytes(b"")
+
+    remove_orphaned_downloads(str(tmp_path), keep=str(tmp_path / "manifest.content"))
+
+    assert sorted(os.listdir(tmp_path)) == ["manifest.content", "x.json"]
@@ -0,0 +1,138 @@
+import json
+import sqlite3
+
+import polars as pl
+import pytest
+
+from src.armor_schema import SOCKET_SCHEMA
+from src.manifest_index import (
+    PROJECTION_VERSION_FILE,
+    ManifestIndex,
+    base_stats_from_sockets,
+    has_projection,
+)
+
+
+def signed(hash_value: int) -> int:
+    return hash_value - (1 << 32) if hash_value & (1 << 31) else hash_value
+
+
+@pytest.fixture
+def manifest_con():
+    con = sqlite3.connect(":memory:")
+    for table in [
+        "DestinyInventoryItemDefinition",
+        "DestinyStatDefinition",
+        "DestinyCollectibleDefinition",
+    ]:
+        con.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, json BLOB)")
+
+    rows = {
+        "DestinyStatDefinition": [
+            (2996146975, {"displayProperties": {"name": "Mobility"}}),
+        ],
+        "DestinyCollectibleDefinition": [
+            (3000000001, {"sourceString": "Source: Last Wish raid."}),
+        ],
+        "DestinyInventoryItemDefinition": [
+            (
+                2800000000,
+                {
+                    "itemType": 2,
+                    "itemSubType": 26,
+                    "classType": 1,
+                    "collectibleHash": 3000000001,
+                    "displayProperties": {"name": "Helmet", "icon": "/helmet.jpg"},
+                    "flavorText": "",
+                    "iconWatermark": "/season.png",
+                    "inventory": {"tierTypeName": "Legendary"},
+                },
+            ),
+            (
+                3500000000,
+                {
+                    "itemType": 19,
+                    "plug": {"plugCategoryIdentifier": "intrinsics"},
+                    "investmentStats": [{"statTypeHash": 2996146975, "value": 12}],
+                },
+            ),
+            (
+                2900000000,
+                {
+                    "itemType": 2,
+                    "itemSubType": 0,
+                    "classType": 3,
+                    "displayProperties": {"name": "Ornament"},
+                    "inventory": {"tierTypeName": ""},
+                },
+            ),
+            (3700000000, {"itemType": 3, "displayProperties": {"name": "Gun"}}),
+        ],
+    }
+    for table, table_rows in rows.items():
+        con.executemany(
+            f"INSERT INTO {table} VALUES (?, ?)",
+            [(signed(hash_value), json.dumps(data)) for hash_value, data in table_rows],
+        )
+
+    yield con
+    con.close()
+
+
+def test_index_holds_only_armor_and_intrinsic_plugs(manifest_con):
+    index = ManifestIndex.from_connection(manifest_con)
+
+    assert sorted(index.armor_rows) == [2800000000, 2900000000]
+    helmet = index.armor_definition(2800000000)
+    assert helmet["ItemSubType"] == "HelmetArmor"
+    assert helmet["Equippable"] == "Hunter"
+    assert helmet["Tier"] == "Legendary"
+    assert helmet["SourceString"] == "Source: Last Wish raid."
+    assert index.armor_definition(2900000000)["Tier"] is None
+    assert index.armor_definition(3700000000) is None
+    assert index.plug_frame.select("PlugHash", "Mobility", "Resilience").rows() == [
+        (3500000000, 12, 0)
+    ]
+
+
+def test_projection_round_trips(manifest_con, tmp_path):
+    index = ManifestIndex.from_connection(manifest_con)
+
+    index.write_projection(str(tmp_path))
+    loaded = ManifestIndex.from_projection(str(tmp_path))
+
+    assert loaded.armor_rows == index.armor_rows
+    assert loaded.plug_frame.equals(index.plug_frame)
+    assert loaded.armor_frame.equals(index.armor_frame)
+
+
+def test_projection_is_rebuilt_after_a_format_change(manifest_con, tmp_path):
+    manifest_path = tmp_path / "manifest.content"
+    manifest_path.write_bytes(b"")
+    ManifestIndex.from_connection(manifest_con).write_projection(str(tmp_path))
+
+    assert has_projection(str(tmp_path), newer_than=str(manifest_path))
+
+    (tmp_path / PROJECTION_VERSION_FILE).write_text("1")
+    assert not has_projection(str(tmp_path), newer_than=str(manifest_path))
+
+
+def test_base_stats_sum_enabled_intrinsic_plugs(manifest_con):
+    index = ManifestIndex.from_connection(manifest_con)
+    sockets = pl.DataFrame(
+        [
+            (1, 3500000000, True),
+            (1, 3500000000, True),
+            (1, 3500000000, False),
+            (1, 1234, True),
+            (2, 1234, True),
+        ],
+        schema=SOCKET_SCHEMA,
+        orient="row",
+    )
+
+    stats = base_stats_from_sockets(sockets, index.plug_frame)
+
+    assert stats.select("Id", "Mobility", "Resilience", "Total").rows() == [
+        (1, 24, 0, 24)
+    ]
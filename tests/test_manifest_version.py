@@ -0,0 +1,128 @@
+import os
+
+import pytest
+import requests
+
+from src import destiny_api
+from src.destiny_api import ManifestBrowser
+from src.manifest_version import ManifestVersion
+
+
+def make_response(version: str, content_path: str) -> requests.Response:
+    res = requests.Response()
+    res.status_code = 200
+    res.headers["ETag"] = '"abc"'
+    res.headers["Last-Modified"] = "Tue, 01 Jul 2025 17:00:00 GMT"
+    res._content = (
+        '{"Response": {"version": "%s", '
+        '"mobileWorldContentPaths": {"en": "%s"}}}' % (version, content_path)
+    ).encode()
+    return res
+
+
+def test_version_round_trip_and_conditional_headers(tmp_path):
+    path = tmp_path / "manifest-version.json"
+    version = ManifestVersion.from_response(make_response("1.0", "/world_1.content"))
+
+    version.save(str(path))
+    loaded = ManifestVersion.load(str(path))
+
+    assert loaded == version
+    assert loaded.conditional_headers() == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Tue, 01 Jul 2025 17:00:00 GMT",
+    }
+
+
+def test_same_content_ignores_validators():
+    old = ManifestVersion("1.0", "/world_1.content", etag='"old"')
+    new = ManifestVersion.from_response(make_response("1.0", "/world_1.content"))
+    changed = ManifestVersion.from_response(make_response("1.1", "/world_2.content"))
+
+    assert old.same_content(new)
+    assert not old.same_content(changed)
+
+
+def test_load_ignores_missing_or_corrupt_files(tmp_path):
+    path = tmp_path / "manifest-version.json"
+    assert ManifestVersion.load(str(path)) is None
+
+    path.write_text("not json")
+    assert ManifestVersion.load(str(path)) is None
+
+
+VERSION_PATH = os.path.join("data", "manifest", "manifest-version.json")
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    # Starts from a local copy of version 1.0 and records every download instead
+    # of running it.
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(VERSION_PATH))
+    with open(os.path.join("data", "manifest", "manifest.content"), "wb") as file:
+        file.write(b"local manifest")
+    ManifestVersion("1.0", "/world_1.content", etag='"old"').save(VERSION_PATH)
+
+    downloads: list[ManifestVersion | None] = []
+    monkeypatch.setattr(
+        ManifestBrowser,
+        "get_manifest",
+        lambda self, version=None: downloads.append(version),
+    )
+    return downloads
+
+
+def open_browser(monkeypatch, response) -> list[dict]:
+    sent_headers = []
+
+    def fake_get(url, headers=None, timeout=None):
+        sent_headers.append(headers)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(destiny_api.requests, "get", fake_get)
+    ManifestBrowser().update_manifest()
+    return sent_headers
+
+
+def test_not_modified_keeps_local_manifest(downloads, monkeypatch):
+    res = requests.Response()
+    res.status_code = 304
+
+    [headers] = open_browser(monkeypatch, res)
+
+    assert headers["If-None-Match"] == '"old"'
+    assert downloads == []
+
+
+def test_same_version_only_refreshes_validators(downloads, monkeypatch):
+    open_browser(monkeypatch, make_response("1.0", "/world_1.content"))
+
+    assert downloads == []
+    assert ManifestVersion.load(VERSION_PATH).etag == '"abc"'
+
+
+def test_changed_version_downloads_manifest(downloads, monkeypatch):
+    open_browser(monkeypatch, make_response("1.1", "/world_2.content"))
+
+    [version] = downloads
+    assert version.same_content(ManifestVersion("1.1", "/world_2.content"))
+
+
+def test_failed_update_falls_back_to_local_copy(downloads, monkeypatch):
+    open_browser(monkeypatch, requests.ConnectionError("offline"))
+    assert downloads == []
+
+    def failing_get_manifest(self, version=None):
+        raise requests.ConnectionError("offline")
+
+    monkeypatch.setattr(ManifestBrowser, "get_manifest", failing_get_manifest)
+    open_browser(monkeypatch, make_response("1.1", "/world_2.content"))
+
+    def locked_get_manifest(self, version=None):
+        raise TimeoutError("Timed out waiting for manifest lock")
+
+    monkeypatch.setattr(ManifestBrowser, "get_manifest", locked_get_manifest)
+    open_browser(monkeypatch, make_response("1.1", "/world_2.content"))
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from src.profile_ingest import ProfileError, parse_profile
+
+
+def make_profile(**response) -> bytes:
+    return json.dumps({"Response": response}).encode()
+
+
+def test_parse_profile_keeps_armor_columns_and_sockets():
+    raw = make_profile(
+        responseMintedTimestamp="2025-01-01T00:00:00Z",
+        secondaryComponentsMintedTimestamp="2025-01-01T00:00:01Z",
+        profileInventory={
+            "data": {
+                "items": [
+                    {"itemHash": 11, "itemInstanceId": "1"},
+                    {"itemHash": 99, "itemInstanceId": "2"},
+                    {"itemHash": 11},
+                ]
+            }
+        },
+        characterEquipment={
+            "data": {"c1": {"items": [{"itemHash": 12, "itemInstanceId": "3"}]}}
+        },
+        itemComponents={
+            "instances": {
+                "data": {
+                    "1": {
+                        "primaryStat": {"value": 2000},
+                        "energy": {"energyCapacity": 9},
+                    }
+                }
+            },
+            "sockets": {
+                "data": {
+                    "1": {
+                        "sockets": [
+                            {"plugHash": 5, "isEnabled": True},
+                            {"isEnabled": False},
+                        ]
+                    },
+                    "2": {"sockets": [{"plugHash": 6, "isEnabled": True}]},
+                }
+            },
+        },
+    )
+
+    profile = parse_profile(raw, armor_hashes={11, 12})
+
+    assert profile.fingerprint == "2025-01-01T00:00:00Z|2025-01-01T00:00:01Z"
+    assert profile.items.rows() == [
+        (1, 11, 2000, 9, "Vault"),
+        (3, 12, 0, 0, "Equipped"),
+    ]
+    assert profile.sockets.rows() == [(1, 5, True)]
+
+    unchanged = parse_profile(
+        raw, armor_hashes={11, 12}, known_fingerprint=profile.fingerprint
+    )
+    assert unchanged.fingerprint == profile.fingerprint
+    assert unchanged.items.is_empty()
+    assert unchanged.sockets.is_empty()
+
+
+def test_parse_profile_fingerprints_unminted_responses():
+    raw = make_profile(profileInventory={"data": {"items": []}})
+
+    profile = parse_profile(raw, armor_hashes=set())
+
+    assert profile.fingerprint is not None
+    assert profile.fingerprint == parse_profile(raw, armor_hashes=set()).fingerprint
+    assert profile.items.is_empty()
+
+
+def test_parse_profile_raises_bungie_errors():
+    with pytest.raises(ProfileError, match="throttled"):
+        parse_profile(b'{"ErrorCode": 51, "Message": "throttled"}', armor_hashes=set())
@@ -0,0 +1,60 @@
+from dataclasses import replace
+
+from src.armor_cleaner import ArmorFilter
+from src.quality_memo import QualityMemo
+from tests.conftest import make_armor, make_armor_df
+
+
+def test_memoized_surface_matches_and_reuses_scores(filter_params, tmp_path):
+    armor = [
+        make_armor(1, (2, 30, 2, 30, 2, 2)),
+        make_armor(2, (10, 10, 10, 10, 10, 10)),
+        make_armor(3, (2, 30, 2, 18, 2, 2), is_artifice=True),
+        make_armor(4, (10, 10, 10, 10, 10, 10), is_artifice=True),
+        make_armor(5, (10, 10, 10, 10, 10, 10), tier="Common"),
+        make_armor(6, (10, 10, 10, 10, 10, 10), equippable="Unknown"),
+    ]
+    df = make_armor_df(armor)
+    memo = QualityMemo(path=str(tmp_path / "memo.arrow"))
+    armor_filter = ArmorFilter(quality_memo=memo)
+
+    expected = ArmorFilter().build_quality_surface(df, filter_params)
+    surface = armor_filter.build_quality_surface(df, filter_params)
+    assert surface.normal_armor.equals(expected.normal_armor)
+    assert surface.artifice_armor.equals(expected.artifice_armor)
+    assert memo.frame["Id"].sort().to_list() == [1, 2, 3, 4]
+
+    # The slider does not touch the memo.
+    for target in [2, 20, 30]:
+        params = replace(filter_params, target_discipline=target)
+        assert armor_filter.filter_quality_surface(surface, target, 1.1).equals(
+            ArmorFilter().filter_armor_items(df, params)
+        )
+
+    memo.save()
+    armor_filter.build_quality_surface(df, filter_params)
+    assert not memo.dirty
+
+    # A re-rolled piece is scored again under its new stats.
+    armor[1] = make_armor(2, (10, 10, 10, 20, 10, 10))
+    df = make_armor_df(armor)
+    expected = ArmorFilter().build_quality_surface(df, filter_params)
+    assert armor_filter.build_quality_surface(df, filter_params).normal_armor.equals(
+        expected.normal_armor
+    )
+    assert memo.frame.height == 5
+    assert memo.dirty
+
+    memo.save()
+    assert QualityMemo.load(memo.path).frame.equals(memo.frame)
+
+
+def test_memo_evicts_least_recently_used_rows(filter_params, tmp_path):
+    memo = QualityMemo(path=str(tmp_path / "memo.arrow"), max_rows=2)
+    armor_filter = ArmorFilter(quality_memo=memo)
+
+    for armor_id in [1, 2, 1, 3]:
+        df = make_armor_df([make_armor(armor_id, (10, 10, 10, 10, 10, 10))])
+        armor_filter.build_quality_surface(df, filter_params)
+
+    assert sorted(memo.frame["Id"].to_list()) == [1, 3]
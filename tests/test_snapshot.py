@@ -0,0 +1,30 @@
+import polars as pl
+
+from src.armor_schema import ARMOR_SCHEMA
+from src.snapshot import InventorySnapshot
+from tests.conftest import make_armor
+
+
+def test_snapshot_round_trips(tmp_path, filter_params):
+    stats = (10, 10, 10, 10, 10, 10)
+    df = pl.DataFrame([make_armor(1, stats), make_armor(2, stats)], schema=ARMOR_SCHEMA)
+    snapshot = InventorySnapshot(
+        df=df, trash_df=df.select("Id", "Hash").head(1), params=filter_params
+    )
+
+    snapshot.save(str(tmp_path))
+    loaded = InventorySnapshot.load(str(tmp_path))
+
+    assert loaded is not None
+    assert loaded.df.equals(df)
+    assert loaded.trash_df.equals(snapshot.trash_df)
+    assert loaded.params == filter_params
+
+
+def test_missing_or_outdated_snapshots_are_ignored(tmp_path):
+    assert InventorySnapshot.load(str(tmp_path)) is None
+
+    df = pl.DataFrame({"Id": [1]})
+    InventorySnapshot(df=df, trash_df=df).save(str(tmp_path))
+
+    assert InventorySnapshot.load(str(tmp_path)) is None